@@ -0,0 +1,24 @@
+"""
+The lake management tools as one importable package.
+
+The package holds every tool and the code they and the Cloud Run service share: the column
+description updater (`lake.updater`), the table comparisons (`lake.compare_tables`,
+`lake.compare_schema`), the schema cache and the deferred imports. A tool module is imported on
+first use, and `python -m lake COMMAND` runs any tool from one entry point. Importing a tool has no
+side effects: configuration is read when its entry point runs and the google-cloud libraries are
+loaded by the first call that needs them.
+"""
+
+import importlib
+
+# Tool modules, imported by load() or on first attribute access
+TOOLS = ("updater", "compare_tables", "compare_schema")
+
+def load(name):
+    """The tool module `name` (one of TOOLS), imported once and kept as `lake.<name>`."""
+    return importlib.import_module(f"{__name__}.{name}")
+
+def __getattr__(name):
+    if name in TOOLS:
+        return load(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,36 @@
+"""
+Single entry point for the lake management tools:
+
+    python -m lake update [--full] [--resume RUN_ID] ...
+    python -m lake compare-tables preprod=my-preprod-project prod=my-prod-project [--drift | --sync ...]
+    python -m lake compare-schema project.dataset.table_a project.dataset.table_b [...]
+
+Only the chosen tool is loaded, after the command line has been read; `COMMAND --help` shows the
+tool's own options.
+"""
+
+import sys, argparse
+
+import lake
+
+# command -> (tool, entry point, summary)
+COMMANDS = {
+    "update": ("updater", "main", "update column descriptions from the metadata table"),
+    "compare-tables": ("compare_tables", "cli", "compare which tables exist in two or more projects, "
+                                                "their column drift, or sync missing tables"),
+    "compare-schema": ("compare_schema", "cli", "compare the schemas, row counts and data of table pairs"),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="lake", description="Lake management tools for BigQuery.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+    for name, (_, _, summary) in COMMANDS.items():
+        # The tool parses its own options, --help included
+        commands.add_parser(name, help=summary, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    tool, entry, _ = COMMANDS[args.command]
+    return getattr(lake.load(tool), entry)(rest, prog=f"lake {args.command}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,854 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from .schema_cache import SchemaCache
+from .lazy_import import lazy_import
+
+bigquery = lazy_import("google.cloud.bigquery")
+exceptions = lazy_import("google.api_core.exceptions")
+
+def get_schema_dict(schema, prefix=""):
+    """{field path: (type, mode)}, including the sub-fields of RECORDs as dotted paths."""
+    fields = {}
+    for field in schema:
+        path = prefix + field.name
+        fields[path] = (field.field_type, field.mode)
+        fields.update(get_schema_dict(field.fields, path + "."))
+    return fields
+
+# Batch mode results; the table is created on first use
+audit_dataset = "audit_dataset"
+audit_table = "table_pair_comparison"
+
+# partition_id formats of time-unit partitioning
+PARTITION_FORMATS = {"HOUR": "%Y%m%d%H", "DAY": "%Y%m%d", "MONTH": "%Y%m", "YEAR": "%Y"}
+
+def full_table_id(table):
+    return f"{table.project}.{table.dataset_id}.{table.table_id}"
+
+def get_row_count(client, table):
+    """Row count from table metadata; only views and external tables, which have none, are counted."""
+    if table.table_type not in ("VIEW", "EXTERNAL") and table.num_rows is not None:
+        return table.num_rows
+    query = f"SELECT COUNT(*) AS row_count FROM `{full_table_id(table)}`"
+    result = client.query(query).result()
+    return list(result)[0]["row_count"]
+
+def partition_spec(table):
+    """(field, unit) the table is partitioned by, or None; ingestion-time tables use _PARTITIONTIME."""
+    if table.time_partitioning:
+        return table.time_partitioning.field or "_PARTITIONTIME", table.time_partitioning.type_
+    if table.range_partitioning:
+        return table.range_partitioning.field, table.range_partitioning.range_.interval
+    return None
+
+def get_partitions(client, table):
+    query = f"""
+    SELECT partition_id, total_rows, last_modified_time
+    FROM `{table.project}.{table.dataset_id}.INFORMATION_SCHEMA.PARTITIONS`
+    WHERE table_name = @table_name
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("table_name", "STRING", table.table_id)
+    ])
+    return {row["partition_id"]: (row["total_rows"], row["last_modified_time"])
+            for row in client.query(query, job_config=job_config).result()}
+
+def compare_partitions(client, table_a, table_b):
+    """Partitions missing from one table or whose row counts differ: {partition_id: (a, b)}, the IDs of
+    the partitions whose row counts match but whose last modified times do not, and the total.
+
+    Each side is (total_rows, last_modified_time) or None. Equal row counts do not mean equal data (rows
+    can be updated in place), so only partitions that also share their modification time are known
+    not to need a data comparison; see data_filter().
+    """
+    parts_a = get_partitions(client, table_a)
+    parts_b = get_partitions(client, table_b)
+    all_parts = parts_a.keys() | parts_b.keys()
+    differing, modified = {}, []
+    for pid in sorted(all_parts):
+        part_a, part_b = parts_a.get(pid), parts_b.get(pid)
+        if part_a is None or part_b is None or part_a[0] != part_b[0]:
+            differing[pid] = (part_a, part_b)
+        elif part_a[1] != part_b[1]:
+            modified.append(pid)
+    return differing, modified, len(all_parts)
+
+def data_filter(table, differing, modified, total):
+    """WHERE clause limiting the data comparison to the `differing` and `modified` partitions: "" to read
+    every partition, or None when every partition has the same row count and modification time."""
+    partition_ids = sorted(differing.keys() | set(modified))
+    if not partition_ids:
+        return None
+    if len(partition_ids) == total:
+        return ""
+    return partition_filter(table, partition_ids) or ""
+
+def partition_filter(table, partition_ids):
+    """WHERE clause that limits a scan of `table` to the given partitions (prunable by BigQuery).
+
+    Returns None when a partition cannot be expressed as a filter on the partitioning column.
+    """
+    field, unit = partition_spec(table)
+    field_type = "TIMESTAMP" if field == "_PARTITIONTIME" else \
+        next(f.field_type for f in table.schema if f.name == field)
+    conditions = []
+    for pid in partition_ids:
+        if pid == "__NULL__" or (pid == "__UNPARTITIONED__" and field == "_PARTITIONTIME"):
+            conditions.append(f"`{field}` IS NULL" if field != "_PARTITIONTIME" else "_PARTITIONTIME IS NULL")
+            continue
+        if pid == "__UNPARTITIONED__":
+            return None
+        if table.range_partitioning:
+            start = int(pid)
+            conditions.append(f"(`{field}` >= {start} AND `{field}` < {start + unit})")
+            continue
+        start = datetime.strptime(pid, PARTITION_FORMATS[unit])
+        if unit == "HOUR":
+            end = start + timedelta(hours=1)
+        elif unit == "DAY":
+            end = start + timedelta(days=1)
+        elif unit == "MONTH":
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            end = start.replace(year=start.year + 1)
+        if field_type == "DATE":
+            start, end = start.date(), end.date()
+        column = "_PARTITIONTIME" if field == "_PARTITIONTIME" else f"`{field}`"
+        conditions.append(f"({column} >= {field_type} '{start}' AND {column} < {field_type} '{end}')")
+    return "WHERE " + " OR ".join(conditions) if conditions else None
+
+def print_partition_report(differing, modified, total):
+    print("\n🗂️ Partition comparison:")
+    if not differing:
+        print(f"  ✔ All {total:,} partitions match in row count.")
+    else:
+        print(f"  {len(differing):,} of {total:,} partitions differ:")
+        for pid, (part_a, part_b) in differing.items():
+            rows_a, modified_a = part_a or ("missing", None)
+            rows_b, modified_b = part_b or ("missing", None)
+            print(f"  - {pid}: rows {rows_a} vs {rows_b}, modified {modified_a} vs {modified_b}")
+    if modified:
+        print(f"  {len(modified):,} partition(s) with matching row counts were modified at different times; "
+              "their data is compared too.")
+
+def compare_schemas(schema_a, schema_b):
+    keys_a = set(schema_a.keys())
+    keys_b = set(schema_b.keys())
+
+    only_in_a = keys_a - keys_b
+    only_in_b = keys_b - keys_a
+    in_both = keys_a & keys_b
+
+    differences = {
+        "only_in_a": {f: schema_a[f] for f in only_in_a},
+        "only_in_b": {f: schema_b[f] for f in only_in_b},
+        "different_definitions": {}
+    }
+
+    for f in in_both:
+        if schema_a[f] != schema_b[f]:
+            differences["different_definitions"][f] = {
+                "table_a": schema_a[f],
+                "table_b": schema_b[f]
+            }
+
+    return differences
+
+def comparable_columns(schema_a, schema_b):
+    """Top-level fields defined identically in both tables, sub-fields included; only these are fingerprinted."""
+    def subtree(schema, field):
+        return {p: d for p, d in schema.items() if p == field or p.startswith(field + ".")}
+    return sorted(f for f in schema_a if "." not in f and subtree(schema_a, f) == subtree(schema_b, f))
+
+def detect_join_keys(schema_a, schema_b):
+    candidates = []
+    for field in schema_a:
+        if field in schema_b and "." not in field:
+            type_a, mode_a = schema_a[field]
+            type_b, mode_b = schema_b[field]
+            if type_a == type_b and type_a not in ("RECORD", "STRUCT") and "REPEATED" not in (mode_a, mode_b):
+                candidates.append(field)
+    return candidates
+
+def fingerprint_source(table, key_cols, columns, where=""):
+    """Per-row key and row fingerprints of `table` over the given common columns."""
+    keys = ", ".join(f"`{c}`" for c in key_cols)
+    cols = ", ".join(f"`{c}`" for c in columns)
+    return f"""
+      SELECT key_json, FARM_FINGERPRINT(key_json) AS key_fp, row_fp
+      FROM (
+        SELECT TO_JSON_STRING(STRUCT({keys})) AS key_json,
+               FARM_FINGERPRINT(TO_JSON_STRING(STRUCT({cols}))) AS row_fp
+        FROM `{table}`
+        {where}
+      )"""
+
+def bucket_summaries(client, table_a, table_b, key_cols, columns, modulus, parent_modulus=None, parents=None,
+                     where="", count_keys=False):
+    """Row count, BIT_XOR of row fingerprints and, with `count_keys`, distinct keys (else None) per key
+    bucket, for both tables in one job.
+
+    Buckets are MOD(key_fp, modulus); with `parents`, only rows whose MOD(key_fp, parent_modulus)
+    is one of them are read, so each level refines the differing buckets of the previous one.
+    """
+    bucket_filter = f"WHERE MOD(key_fp, {parent_modulus}) IN UNNEST(@parents)" if parents else ""
+    key_count = "COUNT(DISTINCT key_fp)" if count_keys else "NULL"
+    query = f"""
+    SELECT side, MOD(key_fp, {modulus}) AS bucket, COUNT(*) AS row_count, BIT_XOR(row_fp) AS row_xor,
+           {key_count} AS key_count
+    FROM (
+      SELECT 'a' AS side, key_fp, row_fp FROM ({fingerprint_source(table_a, key_cols, columns, where)})
+      UNION ALL
+      SELECT 'b' AS side, key_fp, row_fp FROM ({fingerprint_source(table_b, key_cols, columns, where)})
+    )
+    {bucket_filter}
+    GROUP BY side, bucket
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ArrayQueryParameter("parents", "INT64", list(parents or []))
+    ])
+    summaries = {"a": {}, "b": {}}
+    for row in client.query(query, job_config=job_config).result():
+        summaries[row["side"]][row["bucket"]] = (row["row_count"], row["row_xor"], row["key_count"])
+    return summaries["a"], summaries["b"]
+
+def count_mismatches(client, table_a, table_b, key_cols, columns, modulus, buckets, sample_limit, where=""):
+    """Exact mismatch counts per key and sample keys, joining only the rows of the differing buckets.
+
+    Each side is first reduced to one row per key (row count and BIT_XOR of its row fingerprints), so
+    the join is one-to-one even when a key repeats; a key whose rows differ counts once.
+    """
+    def per_key(table):
+        return f"""
+        SELECT key_fp, ANY_VALUE(key_json) AS key_json, COUNT(*) AS row_count, BIT_XOR(row_fp) AS row_xor
+        FROM ({fingerprint_source(table, key_cols, columns, where)})
+        WHERE MOD(key_fp, {modulus}) IN UNNEST(@buckets)
+        GROUP BY key_fp"""
+
+    query = f"""
+    WITH a AS ({per_key(table_a)}),
+         b AS ({per_key(table_b)})
+    SELECT type, COUNT(*) AS row_count, ARRAY_AGG(key_json LIMIT {sample_limit}) AS samples
+    FROM (
+      SELECT CASE WHEN b.key_fp IS NULL THEN 'only_in_a'
+                  WHEN a.key_fp IS NULL THEN 'only_in_b'
+                  ELSE 'mismatched' END AS type,
+             COALESCE(a.key_json, b.key_json) AS key_json
+      FROM a FULL OUTER JOIN b ON a.key_fp = b.key_fp
+      WHERE a.key_fp IS NULL OR b.key_fp IS NULL OR a.row_count != b.row_count OR a.row_xor != b.row_xor
+    )
+    GROUP BY type
+    ORDER BY type
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ArrayQueryParameter("buckets", "INT64", list(buckets))
+    ])
+    return [(row["type"], row["row_count"], row["samples"])
+            for row in client.query(query, job_config=job_config).result()]
+
+def compare_data_records(client, table_a, table_b, join_keys, columns, sample_limit=5,
+                         buckets=1024, leaf_rows=100000, max_depth=4, where="", require_unique=False):
+    """Fingerprint diff of the common `columns`, keyed on `join_keys`.
+
+    Rows are bucketed by a hash of their key and each bucket is summarised by its row count and
+    the XOR of its row fingerprints. Only buckets whose summaries differ are drilled into (each
+    level splits them `buckets` ways) until they hold at most `leaf_rows` rows, and only those
+    rows are joined to count and sample the differences. `where` restricts both scans, e.g. to
+    the partitions that differ. With `require_unique` (for a detected key) the first level also
+    counts distinct keys, and a key that repeats in either table stops the comparison. Returns
+    {difference type: {"rows", "samples"}}, empty when all records match, or None without a
+    (unique) join key.
+    """
+    if not join_keys:
+        print("\n❌ No common fields found to join tables.")
+        return None
+
+    print("\n🔎 Fingerprint Data Comparison (Join on: {})".format(", ".join(join_keys)))
+
+    level, parents = 0, None
+    while True:
+        modulus = buckets ** (level + 1)
+        parent_modulus = buckets ** level
+        summary_a, summary_b = bucket_summaries(client, table_a, table_b, join_keys, columns,
+                                                modulus, parent_modulus, parents, where,
+                                                count_keys=require_unique and level == 0)
+        if require_unique and level == 0:
+            for table, summary in ((table_a, summary_a), (table_b, summary_b)):
+                rows, keys = sum(s[0] for s in summary.values()), sum(s[2] for s in summary.values())
+                if keys != rows:
+                    print(f"\n❌ {', '.join(join_keys)} is not unique in {table} ({rows:,} rows, {keys:,} keys); "
+                          "pass a unique key with --key (repeat it for a composite key).")
+                    return None
+        all_buckets = summary_a.keys() | summary_b.keys()
+        differing = sorted(b for b in all_buckets if summary_a.get(b) != summary_b.get(b))
+        if not differing:
+            print("✔ All records match across the tables.")
+            return {}
+
+        rows = sum(summary_a.get(b, (0,))[0] + summary_b.get(b, (0,))[0] for b in differing)
+        print(f"  Level {level}: {len(differing):,} of {len(all_buckets):,} buckets differ ({rows:,} rows)")
+        # Stop drilling once the rows left are few, or when most buckets differ anyway
+        if (rows <= leaf_rows or level + 1 >= max_depth or len(differing) * 2 > len(all_buckets)
+                or modulus * buckets >= 2 ** 63):
+            break
+        level, parents = level + 1, differing
+
+    results = count_mismatches(client, table_a, table_b, join_keys, columns,
+                               modulus, differing, sample_limit, where)
+    if not results:
+        print("✔ All records match across the tables.")
+        return {}
+    for row_type, row_count, samples in results:
+        print(f"  ❗ {row_type.upper()}: {row_count:,} rows")
+        for key_json in samples:
+            keys = ", ".join(f"{k}={v}" for k, v in json.loads(key_json).items())
+            print(f"      {keys}")
+    return {row_type: {"rows": row_count, "samples": [json.loads(k) for k in samples]}
+            for row_type, row_count, samples in results}
+
+# Types a profile can aggregate; MIN/MAX and APPROX_COUNT_DISTINCT reject the others
+PROFILE_TYPES = {"STRING", "BYTES", "INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC",
+                 "BOOLEAN", "BOOL", "DATE", "DATETIME", "TIME", "TIMESTAMP"}
+
+def profile_columns(schema_a, schema_b):
+    """Top-level, non-repeated columns of a profilable type defined identically in both tables."""
+    return sorted(f for f, (field_type, mode) in schema_a.items()
+                  if "." not in f and schema_b.get(f) == (field_type, mode)
+                  and field_type in PROFILE_TYPES and mode != "REPEATED")
+
+def profile_query(table_id, columns, schema, sample_percent=None, where=""):
+    """One aggregate query profiling every column: nulls, approximate distinct values, min/max and,
+    for strings, an HLL++ sketch of the values."""
+    exprs = ["COUNT(*) AS row_count"]
+    for i, col in enumerate(columns):
+        exprs += [f"COUNTIF(`{col}` IS NULL) AS c{i}_nulls",
+                  f"APPROX_COUNT_DISTINCT(`{col}`) AS c{i}_distinct",
+                  f"MIN(`{col}`) AS c{i}_min",
+                  f"MAX(`{col}`) AS c{i}_max"]
+        if schema[col][0] == "STRING":
+            exprs.append(f"HLL_COUNT.INIT(`{col}`) AS c{i}_hll")
+    sample = f" TABLESAMPLE SYSTEM ({sample_percent} PERCENT)" if sample_percent else ""
+    select = ",\n      ".join(exprs)
+    return f"""
+    SELECT
+      {select}
+    FROM `{table_id}`{sample}
+    {where}
+    """
+
+def estimate_bytes(client, query):
+    """Bytes a query would process, from a dry run (free, and not answered from the cache)."""
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    return client.query(query, job_config=job_config).total_bytes_processed
+
+def profile_tables(client, tables, columns, schema, sample_percent=None, where="", max_bytes=None):
+    """Profile each of `tables` with one aggregate query; returns a profile per table, or None when the
+    dry-run estimate of a query exceeds `max_bytes`.
+
+    The dry run prices a full scan of the filtered table, so with TABLESAMPLE the sampled share of
+    that estimate is checked; `maximum_bytes_billed` enforces the limit on the jobs themselves.
+    """
+    queries = [profile_query(t, columns, schema, sample_percent, where) for t in tables]
+    share = (sample_percent or 100) / 100
+    for table_id, query in zip(tables, queries):
+        estimate = estimate_bytes(client, query)
+        print(f"  {table_id}: ~{estimate * share / 1e9:,.2f} GB to scan"
+              + (f" ({sample_percent}% sample of {estimate / 1e9:,.2f} GB)" if sample_percent else ""))
+        if max_bytes and estimate * share > max_bytes:
+            print(f"\n❌ Over the {max_bytes / 1e9:,.2f} GB limit; sample (--sample) or filter (--partition) "
+                  "the tables, or raise --max-gb.")
+            return None
+
+    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=int(max_bytes) if max_bytes else None)
+    jobs = [client.query(q, job_config=job_config) for q in queries]  # both tables are scanned at once
+    profiles = []
+    for job in jobs:
+        row = list(job.result())[0]
+        profiles.append({"rows": row["row_count"], "columns": {
+            col: {"nulls": row[f"c{i}_nulls"], "distinct": row[f"c{i}_distinct"], "min": row[f"c{i}_min"],
+                  "max": row[f"c{i}_max"], "hll": row.get(f"c{i}_hll")}
+            for i, col in enumerate(columns)}})
+    return profiles
+
+def value_overlap(client, profile_a, profile_b):
+    """{column: Jaccard similarity of the value sets} of the string columns, from their merged HLL sketches.
+
+    The sketches are merged in a query without a table scan, so nothing is billed.
+    """
+    pairs = [(col, stats["hll"], profile_b["columns"][col]["hll"])
+             for col, stats in profile_a["columns"].items()
+             if stats["hll"] is not None and profile_b["columns"][col]["hll"] is not None]
+    if not pairs:
+        return {}
+    params, exprs = [], []
+    for i, (col, hll_a, hll_b) in enumerate(pairs):
+        params += [bigquery.ScalarQueryParameter(f"a{i}", "BYTES", hll_a),
+                   bigquery.ScalarQueryParameter(f"b{i}", "BYTES", hll_b)]
+        exprs.append(f"(SELECT HLL_COUNT.MERGE(s) FROM UNNEST([@a{i}, @b{i}]) AS s) AS u{i}")
+    query = "SELECT " + ", ".join(exprs)
+    row = list(client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=params)).result())[0]
+    overlap = {}
+    for i, (col, _, _) in enumerate(pairs):
+        union = row[f"u{i}"]
+        both = profile_a["columns"][col]["distinct"] + profile_b["columns"][col]["distinct"] - union
+        overlap[col] = min(1.0, max(0.0, both / union)) if union else 1.0
+    return overlap
+
+def compare_profiles(profile_a, profile_b, overlap, tolerance=0.05, sampled=False):
+    """Column-by-column differences between two profiles: [(column, metric, value in A, value in B)].
+
+    Null rates and value overlap are compared with an absolute `tolerance`, distinct counts
+    relative to the larger one; min and max must match. Two `sampled` profiles rarely share their
+    extremes, so for them only value ranges that do not overlap at all are reported.
+    """
+    def rate(profile, col):
+        return profile["columns"][col]["nulls"] / profile["rows"] if profile["rows"] else 0.0
+
+    drift = []
+    for col, a in profile_a["columns"].items():
+        b = profile_b["columns"][col]
+        null_a, null_b = rate(profile_a, col), rate(profile_b, col)
+        if abs(null_a - null_b) > tolerance:
+            drift.append((col, "null rate", f"{null_a:.1%}", f"{null_b:.1%}"))
+        if abs(a["distinct"] - b["distinct"]) > tolerance * max(a["distinct"], b["distinct"]):
+            drift.append((col, "distinct", f"{a['distinct']:,}", f"{b['distinct']:,}"))
+        if sampled:
+            if None not in (a["min"], a["max"], b["min"], b["max"]) and (a["max"] < b["min"] or b["max"] < a["min"]):
+                drift.append((col, "range", f"{a['min']} to {a['max']}", f"{b['min']} to {b['max']}"))
+        else:
+            for metric in ("min", "max"):
+                if a[metric] != b[metric]:
+                    drift.append((col, metric, a[metric], b[metric]))
+        if col in overlap and overlap[col] < 1 - tolerance:
+            drift.append((col, "value overlap", f"{overlap[col]:.1%}", ""))
+    return drift
+
+def compare_column_profiles(client, table_a, table_b, columns, schema, sample_percent=None, where="",
+                            max_bytes=None, tolerance=0.05):
+    """Profile the common `columns` of both tables and report the columns whose profiles differ.
+
+    A cheap first pass for data drift: one aggregate scan per table and no join. Returns the
+    differences as [{"column", "metric", "table_a", "table_b"}], or None when nothing was profiled.
+    """
+    if not columns:
+        print("\n⚠️ No common columns to profile.")
+        return None
+    print(f"\n📈 Column Profile Comparison ({len(columns)} column(s))")
+    profiles = profile_tables(client, [table_a, table_b], columns, schema, sample_percent, where, max_bytes)
+    if profiles is None:
+        return None
+    profile_a, profile_b = profiles
+    print(f"  Rows profiled: {profile_a['rows']:,} vs {profile_b['rows']:,}")
+    drift = compare_profiles(profile_a, profile_b, value_overlap(client, profile_a, profile_b), tolerance,
+                             sampled=bool(sample_percent))
+    if not drift:
+        print("✔ All column profiles match.")
+        return []
+    print(f"  {len({col for col, *_ in drift}):,} of {len(columns):,} column(s) differ:")
+    for col, metric, value_a, value_b in drift:
+        print(f"  ❗ {col}: {metric} {value_a}" + (f" vs {value_b}" if value_b != "" else ""))
+    return [{"column": col, "metric": metric, "table_a": str(value_a), "table_b": str(value_b)}
+            for col, metric, value_a, value_b in drift]
+
+def print_report(table_a, table_b, count_a, count_b, differences):
+    print("=" * 80)
+    print("📊 BigQuery Schema & Row Count Comparison Report")
+    print("=" * 80)
+    print(f"Table A: {table_a}")
+    print(f"Table B: {table_b}")
+    print(f"\n🧮 Row count:")
+    print(f"  - {table_a}: {count_a:,} rows")
+    print(f"  - {table_b}: {count_b:,} rows\n")
+
+    print("🟨 Fields only in Table A:")
+    if differences["only_in_a"]:
+        for f, defn in differences["only_in_a"].items():
+            print(f"  - {f}: {defn}")
+    else:
+        print("  ✔ No extra fields in Table A.")
+
+    print("\n🟦 Fields only in Table B:")
+    if differences["only_in_b"]:
+        for f, defn in differences["only_in_b"].items():
+            print(f"  - {f}: {defn}")
+    else:
+        print("  ✔ No extra fields in Table B.")
+
+    print("\n🔁 Fields with different definitions:")
+    if differences["different_definitions"]:
+        for f, defs in differences["different_definitions"].items():
+            print(f"  - {f}:")
+            print(f"      Table A: {defs['table_a']}")
+            print(f"      Table B: {defs['table_b']}")
+    else:
+        print("  ✔ No fields with differing types or modes.")
+    print("=" * 80)
+
+def read_manifest(path):
+    """Table pairs from a manifest with one `table_a table_b` (or `table_a,table_b`) pair per line; # starts a comment."""
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            tables = line.split("#", 1)[0].replace(",", " ").split()
+            if not tables:
+                continue
+            if len(tables) != 2:
+                raise ValueError(f"{path}:{number}: expected two tables, got {len(tables)}")
+            pairs.append(tuple(tables))
+    return pairs
+
+def dataset_pairs(client, mappings, workers=16):
+    """Pairs of same-named tables for every (dataset_a, dataset_b) mapping, including tables only one side has.
+
+    Returns (pairs, unlisted). A mapping with a dataset that cannot be listed (missing or not
+    accessible) adds no pairs and goes to `unlisted` as ((dataset_a, dataset_b), {side: exception}).
+    """
+    def list_tables(dataset):
+        ref = bigquery.DatasetReference.from_string(dataset, default_project=client.project)
+        dataset_id = f"{ref.project}.{ref.dataset_id}"
+        try:
+            return dataset_id, {t.table_id for t in client.list_tables(dataset_id)}
+        except Exception as e:
+            return dataset_id, e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        listed = list(pool.map(list_tables, [d for mapping in mappings for d in mapping]))
+    pairs, unlisted = [], []
+    for (dataset_a, tables_a), (dataset_b, tables_b) in zip(listed[::2], listed[1::2]):
+        failed = {side: tables for side, tables in (("table_a", tables_a), ("table_b", tables_b))
+                  if isinstance(tables, Exception)}
+        if failed:
+            unlisted.append(((dataset_a, dataset_b), failed))
+            continue
+        pairs += [(f"{dataset_a}.{t}", f"{dataset_b}.{t}") for t in sorted(tables_a | tables_b)]
+    return pairs, unlisted
+
+def revalidate_cached(client, cache, table_ids, workers=16):
+    """Revalidate the datasets holding cache entries of `table_ids`, with one __TABLES__ query each.
+
+    Entries are then only served while their table's last-modified time is unchanged, so a load
+    shows up in the next comparison; entries of a dataset that cannot be revalidated are refetched.
+    """
+    by_dataset = defaultdict(set)
+    for table_id in table_ids:
+        dataset_ref, _, table = cache.table_id(client, table_id).rpartition(".")
+        by_dataset[dataset_ref].add(table)
+
+    def revalidate(dataset_ref):
+        try:
+            cache.revalidate(client, dataset_ref)
+        except Exception:
+            pass
+
+    cached = [d for d, tables in by_dataset.items() if tables & cache.cached_tables(d)]
+    if cached:
+        with ThreadPoolExecutor(max_workers=min(workers, len(cached))) as pool:
+            list(pool.map(revalidate, cached))
+
+def fetch_tables(client, table_ids, cache=None, workers=16):
+    """{table_id: Table, or the exception raised fetching it}, all fetched concurrently."""
+    if cache:
+        revalidate_cached(client, cache, table_ids, workers)
+    get_table = (lambda ref: cache.get_table(client, ref, ttl=0)) if cache else client.get_table
+
+    def fetch(table_id):
+        try:
+            return get_table(table_id)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(table_ids, pool.map(fetch, table_ids)))
+
+def batch_row_counts(tables, workers=16):
+    """{table_id: row count} of all fetched tables.
+
+    Tables use the count in their metadata; views and external tables are counted with one
+    UNION ALL query per project and location, and those queries run in parallel.
+    """
+    counts, to_count = {}, defaultdict(list)
+    for table_id, table in tables.items():
+        if isinstance(table, Exception):
+            continue
+        if table.table_type not in ("VIEW", "EXTERNAL") and table.num_rows is not None:
+            counts[table_id] = table.num_rows
+        else:
+            to_count[(table.project, table.location)].append(table_id)
+
+    def count(group):
+        (project, location), table_ids = group
+        query = "\nUNION ALL\n".join(
+            f"SELECT '{table_id}' AS table_id, COUNT(*) AS row_count FROM `{table_id}`" for table_id in table_ids)
+        try:
+            rows = bigquery.Client(project=project).query(query, location=location).result()
+            return {row["table_id"]: row["row_count"] for row in rows}
+        except Exception as e:
+            print(f"⚠️ Could not count {len(table_ids)} table(s) in {project}: {e}", file=sys.stderr)
+            return {}
+
+    if to_count:
+        with ThreadPoolExecutor(max_workers=min(workers, len(to_count))) as pool:
+            for result in pool.map(count, to_count.items()):
+                counts.update(result)
+    return counts
+
+def failure_result(result, failed):
+    """Mark `result` missing (every side in `failed` was not found) or error; `failed` is {side: exception}."""
+    missing = all(isinstance(e, exceptions.NotFound) for e in failed.values())
+    result["status"] = "missing" if missing else "error"
+    result["missing" if missing else "error"] = {side: str(e) for side, e in failed.items()}
+    return result
+
+def compare_pair(client, table_a, table_b, tables, counts, data=None, join_keys=None, buckets=1024,
+                 sample_percent=None, max_gb=None, tolerance=0.05):
+    """Machine-readable comparison of one pair; status is match, differ, missing or error."""
+    result = {"table_a": table_a, "table_b": table_b, "status": "match",
+              "row_count_a": counts.get(table_a), "row_count_b": counts.get(table_b)}
+    failed = {side: tables[t] for side, t in (("table_a", table_a), ("table_b", table_b))
+              if isinstance(tables[t], Exception)}
+    if failed:
+        return failure_result(result, failed)
+
+    bq_table_a, bq_table_b = tables[table_a], tables[table_b]
+    schema_a_dict = get_schema_dict(bq_table_a.schema)
+    schema_b_dict = get_schema_dict(bq_table_b.schema)
+    differences = compare_schemas(schema_a_dict, schema_b_dict)
+    result.update(only_in_a=sorted(differences["only_in_a"]), only_in_b=sorted(differences["only_in_b"]),
+                  different_definitions=differences["different_definitions"])
+    schema_differs = any(differences.values())
+    if schema_differs or result["row_count_a"] != result["row_count_b"]:
+        result["status"] = "differ"
+    if not data:
+        return result
+
+    try:
+        where = ""
+        if partition_spec(bq_table_a) and partition_spec(bq_table_a) == partition_spec(bq_table_b):
+            differing, modified, total = compare_partitions(client, bq_table_a, bq_table_b)
+            result.update(partitions_differing=sorted(differing), partitions_modified=modified)
+            where = data_filter(bq_table_a, differing, modified, total)
+            if where is None:
+                return result
+        if data == "profile":
+            columns = profile_columns(schema_a_dict, schema_b_dict)
+            found = compare_column_profiles(client, table_a, table_b, columns, schema_a_dict, sample_percent, where,
+                                            max_gb * 1e9 if max_gb else None, tolerance)
+        else:
+            keys = join_keys or detect_join_keys(schema_a_dict, schema_b_dict)[:1]
+            found = compare_data_records(client, table_a, table_b, keys, comparable_columns(schema_a_dict, schema_b_dict),
+                                         buckets=buckets, where=where, require_unique=not join_keys)
+    except Exception as e:
+        result.update(status="error", error={"data": str(e)})
+        return result
+    if found is None:
+        reason = ("no common columns to profile, or over --max-gb" if data == "profile"
+                  else "no unique join key detected; pass --key")
+        result.update(status="error", error={"data": f"not compared: {reason}"})
+        return result
+    result["data"] = found
+    if found:
+        result["status"] = "differ"
+    return result
+
+def write_audit(rows, table_ref):
+    """Append the batch results to `table_ref` in one load job."""
+    job_config = bigquery.LoadJobConfig(
+        schema=[
+            bigquery.SchemaField("run_time", "TIMESTAMP"),
+            bigquery.SchemaField("table_a", "STRING"),
+            bigquery.SchemaField("table_b", "STRING"),
+            bigquery.SchemaField("status", "STRING"),
+            bigquery.SchemaField("row_count_a", "INTEGER"),
+            bigquery.SchemaField("row_count_b", "INTEGER"),
+            bigquery.SchemaField("details", "STRING")
+        ],
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED
+    )
+    project = table_ref.split(".")[0]
+    bigquery.Client(project=project).load_table_from_json(rows, table_ref, job_config=job_config).result()
+
+def batch(pairs, project_id=None, data=None, join_keys=None, buckets=1024, sample_percent=None, max_gb=None,
+          tolerance=0.05, workers=16, output=None, output_format="json", audit_table_ref=None, audit=True,
+          unlisted=()):
+    """Compare many table pairs without prompting and write the results as JSON or NDJSON.
+
+    Schemas are fetched concurrently, row counts come from metadata or one query per project, and
+    the pairs (with their optional `data` comparison: "records" or "profile") run on `workers`
+    threads. Dataset mappings that could not be listed (`unlisted`, from dataset_pairs()) are
+    reported as one result each, with "scope": "dataset". Progress goes to stderr; returns the results.
+    """
+    client = bigquery.Client(project=project_id)
+    cache = SchemaCache.from_env()
+    run_time = datetime.now(timezone.utc).isoformat()
+
+    table_ids = sorted({t for pair in pairs for t in pair})
+    print(f"🔎 Comparing {len(pairs):,} pair(s) of {len(table_ids):,} table(s)", file=sys.stderr)
+    tables = fetch_tables(client, table_ids, cache, workers)
+    counts = batch_row_counts(tables, workers)
+
+    def run(pair):
+        # The per-pair reports of the data comparison are not part of the batch output
+        return compare_pair(client, *pair, tables, counts, data, join_keys, buckets, sample_percent, max_gb,
+                            tolerance)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, pairs))
+    results += [failure_result({"table_a": dataset_a, "table_b": dataset_b, "scope": "dataset",
+                                "row_count_a": None, "row_count_b": None}, failed)
+                for (dataset_a, dataset_b), failed in unlisted]
+
+    summary = defaultdict(int)
+    for r in results:
+        summary[r["status"]] += 1
+        if r["status"] != "match":
+            print(f"  ❗ {r['table_a']} vs {r['table_b']}: {r['status']}", file=sys.stderr)
+    print("✅ " + ", ".join(f"{n:,} {status}" for status, n in sorted(summary.items())), file=sys.stderr)
+    if cache:
+        print(f"🗄️ Schema cache: {cache.summary()}", file=sys.stderr)
+
+    with (open(output, "w", encoding="utf-8") if output else contextlib.nullcontext(sys.stdout)) as out:
+        if output_format == "ndjson":
+            for r in results:
+                out.write(json.dumps({"run_time": run_time, **r}, default=str) + "\n")
+        else:
+            json.dump({"run_time": run_time, "summary": dict(summary), "pairs": results}, out, indent=2, default=str)
+            out.write("\n")
+    if output:
+        print(f"📄 Results saved to: {output}", file=sys.stderr)
+
+    if audit:
+        table_ref = audit_table_ref or f"{os.getenv('PROJECT_ID') or client.project}.{audit_dataset}.{audit_table}"
+        rows = [{"run_time": run_time, "table_a": r["table_a"], "table_b": r["table_b"], "status": r["status"],
+                 "row_count_a": r["row_count_a"], "row_count_b": r["row_count_b"],
+                 "details": json.dumps(r, default=str)} for r in results]
+        try:
+            write_audit(rows, table_ref)
+            print(f"✅ Exported {len(rows)} rows to {table_ref}", file=sys.stderr)
+        except Exception as e:
+            print("Errors while loading:", e, file=sys.stderr)
+    return results
+
+def main(table_a, table_b, project_id=None, join_keys=None, buckets=1024, profile=False, sample_percent=None,
+         partitions=None, max_gb=None, tolerance=0.05, data=None):
+    client = bigquery.Client(project=project_id)
+
+    # Schemas and row counts come from the on-disk cache while the tables are unmodified
+    cache = SchemaCache.from_env()
+    if cache:
+        revalidate_cached(client, cache, [table_a, table_b])
+    get_table = (lambda ref: cache.get_table(client, ref, ttl=0)) if cache else client.get_table
+    bq_table_a = get_table(table_a)
+    bq_table_b = get_table(table_b)
+
+    schema_a_dict = get_schema_dict(bq_table_a.schema)
+    schema_b_dict = get_schema_dict(bq_table_b.schema)
+
+    differences = compare_schemas(schema_a_dict, schema_b_dict)
+
+    count_a = get_row_count(client, bq_table_a)
+    count_b = get_row_count(client, bq_table_b)
+
+    print_report(table_a, table_b, count_a, count_b, differences)
+    if cache:
+        print(f"🗄️ Schema cache: {cache.summary()}")
+
+    # Identically partitioned tables: compare partition metadata and diff only what differs
+    where = ""
+    same_partitioning = partition_spec(bq_table_a) and partition_spec(bq_table_a) == partition_spec(bq_table_b)
+    if partitions:
+        if not same_partitioning:
+            print("\n❌ --partition needs two tables partitioned the same way.")
+            return
+        where = partition_filter(bq_table_a, partitions)
+        if where is None:
+            print("\n❌ These partitions cannot be expressed as a filter on the partitioning column.")
+            return
+    elif same_partitioning:
+        differing, modified, total = compare_partitions(client, bq_table_a, bq_table_b)
+        print_partition_report(differing, modified, total)
+        where = data_filter(bq_table_a, differing, modified, total)
+        if where is None:
+            print("  Every partition has the same row count and modification time; skipping the data comparison.")
+            return
+
+    if profile or data == "profile":
+        compare_column_profiles(client, table_a, table_b, profile_columns(schema_a_dict, schema_b_dict), schema_a_dict,
+                                sample_percent, where, max_gb * 1e9 if max_gb else None, tolerance)
+        return
+
+    #ask user if they want to compare data records, unless --data says so
+    compare_data = {"records": "y", "none": "n"}.get(data) or input("Do you want to compare data records? (y/n): ")
+    if compare_data == "y":
+        columns = comparable_columns(schema_a_dict, schema_b_dict)
+        keys = join_keys or detect_join_keys(schema_a_dict, schema_b_dict)[:1]  # top candidate
+        if not keys:
+            print("\n⚠️ No valid common join keys found.")
+        else:
+            compare_data_records(client, table_a, table_b, keys, columns, buckets=buckets, where=where,
+                                 require_unique=not join_keys)
+
+def cli(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Compare schemas, row counts, and records of two BigQuery tables.")
+    parser.add_argument("table_a", nargs="?", help="Fully qualified table A (e.g. project.dataset.table)")
+    parser.add_argument("table_b", nargs="?", help="Fully qualified table B (e.g. project.dataset.table)")
+    parser.add_argument("--project", help="Optional GCP project ID")
+    parser.add_argument("--key", action="append", help="Join key column (repeat for composite keys); "
+                                                       "defaults to the first detected candidate if it is unique")
+    parser.add_argument("--buckets", type=int, default=1024, help="Hash buckets per drill-down level")
+    parser.add_argument("--profile", action="store_true",
+                        help="Compare per-column profiles (one aggregate scan per table) instead of records")
+    parser.add_argument("--sample", type=float, metavar="PERCENT", help="Profile a TABLESAMPLE SYSTEM sample")
+    parser.add_argument("--partition", action="append",
+                        help="Only read this partition ID, e.g. 20250601 (repeatable)")
+    parser.add_argument("--max-gb", type=float, default=10.0,
+                        help="Refuse profile queries whose dry-run estimate is above this many GB")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Allowed difference in null rate, distinct count and value overlap")
+    parser.add_argument("--data", choices=["none", "records", "profile"],
+                        help="Data comparison to run without prompting (batch mode default: none)")
+    batch_args = parser.add_argument_group("batch mode")
+    batch_args.add_argument("--manifest", help="File with one `table_a table_b` pair per line")
+    batch_args.add_argument("--datasets", action="append", metavar="DATASET_A=DATASET_B",
+                            help="Compare the same-named tables of two datasets (repeatable)")
+    batch_args.add_argument("--workers", type=int, default=16, help="Pairs compared in parallel")
+    batch_args.add_argument("--format", choices=["json", "ndjson"], default="json")
+    batch_args.add_argument("--output", help="Results file (default: stdout)")
+    batch_args.add_argument("--audit-table", help="Audit table for the results "
+                                                  f"(default: PROJECT_ID.{audit_dataset}.{audit_table})")
+    batch_args.add_argument("--no-audit", action="store_true", help="Do not write the results to BigQuery")
+
+    args = parser.parse_args(argv)
+    if args.manifest or args.datasets:
+        try:
+            pairs = read_manifest(args.manifest) if args.manifest else []
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        unlisted = []
+        if args.datasets:
+            mappings = [tuple(m.split("=", 1)) for m in args.datasets]
+            if any(len(m) != 2 for m in mappings):
+                parser.error("--datasets expects DATASET_A=DATASET_B")
+            found, unlisted = dataset_pairs(bigquery.Client(project=args.project), mappings, args.workers)
+            pairs += found
+        data = None if args.data == "none" else ("profile" if args.profile else args.data)
+        results = batch(pairs, args.project, data, args.key, args.buckets, args.sample, args.max_gb,
+                        args.tolerance, args.workers, args.output, args.format, args.audit_table, not args.no_audit,
+                        unlisted)
+        # Usable as a release gate: non-zero unless every pair matches
+        sys.exit(0 if all(r["status"] == "match" for r in results) else 1)
+    if not (args.table_a and args.table_b):
+        parser.error("give table_a and table_b, or --manifest / --datasets for batch mode")
+    main(args.table_a, args.table_b, args.project, args.key, args.buckets, args.profile, args.sample,
+         args.partition, args.max_gb, args.tolerance, args.data)
+
+if __name__ == "__main__":
+    cli()
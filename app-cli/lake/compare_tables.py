@@ -0,0 +1,570 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from collections import defaultdict, deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from .schema_cache import SchemaCache
+from .lazy_import import lazy_import
+
+bigquery = lazy_import("google.cloud.bigquery")
+exceptions = lazy_import("google.api_core.exceptions")
+
+audit_dataset = "audit_dataset"
+audit_table = "table_between_envs"
+drift_audit_table = "schema_drift_between_envs"
+sync_audit_table = "table_sync_between_envs"
+output_path = "table_comparison.txt"
+drift_output_path = "schema_drift.txt"
+sync_output_path = "table_sync.txt"
+poll_seconds = 2  # how often running copy and DDL jobs are polled, all in one sweep
+
+# --sync modes and the plan's wording for them
+SYNC_ACTIONS = {
+    "schema": "create empty table with the source's schema, partitioning and clustering",
+    "like": "CREATE TABLE ... LIKE the source",
+    "copy": "copy table with its data",
+}
+
+# Table types --sync creates; views, materialized views, external tables and snapshots are skipped
+SYNCABLE_TYPES = ("BASE TABLE", "CLONE")
+
+def parse_environment(spec):
+    """`name=project` or just `project` (the project ID doubles as the name)."""
+    name, _, project = spec.rpartition("=")
+    return (name or project), project
+
+def get_tables_information_schema(client, project, region):
+    """All (dataset, table) pairs of `project` in `region` with a single INFORMATION_SCHEMA query."""
+    query = f"""
+        SELECT table_schema, table_name
+        FROM `{project}`.`region-{region}`.INFORMATION_SCHEMA.TABLES
+    """
+    return {(row.table_schema, row.table_name) for row in client.query(query).result()}
+
+def get_tables_listing(client, project, workers):
+    """All (dataset, table) pairs of `project`, listing the datasets' tables in parallel."""
+    datasets = [dataset.dataset_id for dataset in client.list_datasets(project=project)]
+
+    def list_dataset(dataset_id):
+        return [(dataset_id, table.table_id)
+                for table in client.list_tables(f"{project}.{dataset_id}", page_size=1000)]
+
+    tables = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for pairs in pool.map(list_dataset, datasets):
+            tables.update(pairs)
+    return tables
+
+def get_all_tables(client, project, region=None, workers=16):
+    if region:
+        try:
+            return get_tables_information_schema(client, project, region)
+        except Exception as e:
+            print(f"⚠️ INFORMATION_SCHEMA inventory failed for {project}, listing datasets instead: {e}")
+    return get_tables_listing(client, project, workers)
+
+def get_inventories(environments, region=None, workers=16):
+    """Fetch every environment's inventory concurrently; returns {name: {(dataset, table)}}."""
+    with ThreadPoolExecutor(max_workers=len(environments)) as pool:
+        futures = {
+            name: pool.submit(get_all_tables, bigquery.Client(project=project), project, region, workers)
+            for name, project in environments
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+def get_columns(client, source, tables=None):
+    """{(dataset, table): {field_path: (type, mode, description)}} from one INFORMATION_SCHEMA source.
+
+    Nested RECORD fields get their own field paths; a STRUCT's type is reduced to STRUCT so that a
+    change to one sub-field is reported against that sub-field only. `tables` limits the query to
+    these table names.
+    """
+    query = f"""
+        SELECT p.table_schema, p.table_name, p.field_path, p.data_type, p.description, c.is_nullable
+        FROM {source}.COLUMN_FIELD_PATHS p
+        LEFT JOIN {source}.COLUMNS c
+          ON c.table_schema = p.table_schema AND c.table_name = p.table_name AND c.column_name = p.field_path
+        {"WHERE p.table_name IN UNNEST(@tables)" if tables is not None else ""}
+    """
+    job_config = None
+    if tables is not None:
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("tables", "STRING", sorted(tables))])
+    columns = defaultdict(dict)
+    for row in client.query(query, job_config=job_config).result():
+        data_type = row.data_type
+        if data_type.startswith("STRUCT<"):
+            data_type = "STRUCT"
+        elif data_type.startswith("ARRAY<STRUCT<"):
+            data_type = "ARRAY<STRUCT>"
+        mode = "REPEATED" if data_type.startswith("ARRAY<") else "REQUIRED" if row.is_nullable == "NO" else "NULLABLE"
+        columns[(row.table_schema, row.table_name)][row.field_path] = (data_type, mode, row.description or "")
+    return columns
+
+# Legacy type names of the tables API and their INFORMATION_SCHEMA spelling
+STANDARD_TYPES = {"INTEGER": "INT64", "FLOAT": "FLOAT64", "BOOLEAN": "BOOL", "RECORD": "STRUCT"}
+
+def schema_columns(fields, prefix=""):
+    """A table schema's columns in the form get_columns reads them from INFORMATION_SCHEMA."""
+    columns = {}
+    for field in fields:
+        data_type = STANDARD_TYPES.get(field.field_type, field.field_type)
+        if field.max_length:
+            data_type += f"({field.max_length})"
+        elif field.precision:
+            data_type += f"({field.precision}" + (f", {field.scale}" if field.scale is not None else "") + ")"
+        mode = field.mode
+        if mode == "REPEATED":
+            data_type = f"ARRAY<{data_type}>"
+        elif prefix:
+            mode = "NULLABLE"  # INFORMATION_SCHEMA only knows REQUIRED for top-level columns
+        columns[prefix + field.name] = (data_type, mode, field.description or "")
+        columns.update(schema_columns(field.fields, prefix + field.name + "."))
+    return columns
+
+def get_cached_columns(client, cache, project, dataset):
+    """A dataset's columns from the schema cache, revalidated by one __TABLES__ query.
+
+    Returns the columns of the tables whose entries are current and the names of the others.
+    """
+    columns, stale = {}, []
+    for table_id in cache.revalidate(client, f"{project}.{dataset}"):
+        table = cache.lookup(f"{project}.{dataset}.{table_id}", ttl=0)
+        if table is None:
+            stale.append(table_id)
+        else:
+            columns[(dataset, table_id)] = schema_columns(table.schema)
+    return columns, stale
+
+def get_all_columns(client, project, region=None, workers=16, cache=None):
+    """Every column of every table in `project`: one region-wide query, or per dataset in parallel."""
+    if region:
+        try:
+            return get_columns(client, f"`{project}`.`region-{region}`.INFORMATION_SCHEMA")
+        except Exception as e:
+            print(f"⚠️ Region-wide column query failed for {project}, querying per dataset instead: {e}")
+
+    def dataset_columns(dataset_id):
+        # One COLUMN_FIELD_PATHS query per dataset, unless the schema cache (filled by the other tools)
+        # already holds tables of it: then only the tables changed since they were cached are queried.
+        source = f"`{project}`.`{dataset_id}`.INFORMATION_SCHEMA"
+        if not cache or not cache.cached_tables(f"{project}.{dataset_id}"):
+            return get_columns(client, source)
+        columns, stale = get_cached_columns(client, cache, project, dataset_id)
+        if stale:
+            columns.update(get_columns(client, source, stale))
+        return columns
+
+    datasets = [dataset.dataset_id for dataset in client.list_datasets(project=project)]
+    columns = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found in pool.map(dataset_columns, datasets):
+            columns.update(found)
+    return columns
+
+def schema_signature(columns):
+    return hashlib.sha1(json.dumps(sorted(columns.items())).encode()).hexdigest()
+
+def column_drift(schemas):
+    """[(field_path, status, {env: definition})] for one table; `schemas` is {env: columns}."""
+    names = list(schemas)
+    drift = []
+    for path in sorted(set().union(*schemas.values())):
+        defs = {name: schemas[name].get(path) for name in names}
+        present = [name for name in names if defs[name]]
+        if len(present) < len(names):
+            status = table_status(present, names)
+        else:
+            kinds = [kind for i, kind in enumerate(("type", "mode", "description"))
+                     if len({d[i] for d in defs.values()}) > 1]
+            if not kinds:
+                continue
+            status = "/".join(kinds) + " differs"
+        drift.append((path, status, {
+            name: dict(zip(("type", "mode", "description"), d)) if d else None for name, d in defs.items()
+        }))
+    return drift
+
+def table_status(present, names):
+    """Status text for a table that exists in the environments listed in `present`."""
+    if len(present) == len(names):
+        return "in both" if len(names) == 2 else "in all"
+    if len(present) == 1:
+        return f"only in {present[0]}"
+    return "missing in " + ", ".join(n for n in names if n not in present)
+
+def main(environments, region=None, workers=16):
+    load_dotenv()
+    audit_project = os.getenv("PROJECT_ID") or environments[0][1]
+    names = [name for name, _ in environments]
+
+    inventories = get_inventories(environments, region, workers)
+
+    # Seed the sections so they are always written, in environment order
+    by_status = {table_status(names, names): []}
+    by_status.update({f"only in {name}": [] for name in names})
+    for key in set().union(*inventories.values()):
+        present = [n for n in names if key in inventories[n]]
+        by_status.setdefault(table_status(present, names), []).append(key)
+
+    run_time = datetime.utcnow().isoformat()
+    rows_for_bq = []
+
+    with open(output_path, "w") as f:
+        for i, (status, tables) in enumerate(by_status.items()):
+            header = "✅ Tables in both:" if status == "in both" else \
+                     "✅ Tables in all environments:" if status == "in all" else f"❌ {status.capitalize()}:"
+            if i:
+                f.write("\n")
+            f.write(f"{header}\n")
+            for dataset_id, table_id in sorted(tables):
+                f.write(f"{dataset_id}.{table_id}\n")
+                rows_for_bq.append({
+                    "run_time": run_time,
+                    "dataset": dataset_id,
+                    "table_name": table_id,
+                    "status": status
+                })
+
+    # Define and create table if not exists
+    audit_client = bigquery.Client(project=audit_project)
+    table_ref = f"{audit_project}.{audit_dataset}.{audit_table}"
+    schema = [
+        bigquery.SchemaField("run_time", "TIMESTAMP"),
+        bigquery.SchemaField("dataset", "STRING"),
+        bigquery.SchemaField("table_name", "STRING"),
+        bigquery.SchemaField("status", "STRING")
+    ]
+
+    try:
+        audit_client.get_table(table_ref)
+    except:
+        table = bigquery.Table(table_ref, schema=schema)
+        audit_client.create_table(table)
+
+    # Insert into BigQuery
+    errors = audit_client.insert_rows_json(table_ref, rows_for_bq)
+    if errors:
+        print("Errors while inserting:", errors)
+    else:
+        print(f"✅ Exported {len(rows_for_bq)} rows to {table_ref}")
+        print(f"📄 Comparison saved to: {output_path}")
+
+def schema_drift(environments, region=None, workers=16):
+    """Column-level drift of every table that exists in at least two of the environments."""
+    load_dotenv()
+    audit_project = os.getenv("PROJECT_ID") or environments[0][1]
+    names = [name for name, _ in environments]
+    cache = SchemaCache.from_env()
+
+    with ThreadPoolExecutor(max_workers=len(environments)) as pool:
+        futures = {
+            name: pool.submit(get_all_columns, bigquery.Client(project=project), project, region, workers, cache)
+            for name, project in environments
+        }
+        columns = {name: future.result() for name, future in futures.items()}
+    signatures = {name: {key: schema_signature(cols) for key, cols in columns[name].items()} for name in names}
+
+    run_time = datetime.utcnow().isoformat()
+    rows_for_bq = []
+    identical = drifted = 0
+
+    with open(drift_output_path, "w") as f:
+        for key in sorted(set().union(*signatures.values())):
+            present = [n for n in names if key in signatures[n]]
+            # Tables missing from an environment are reported by the inventory comparison
+            if len(present) < 2:
+                continue
+            if len({signatures[n][key] for n in present}) == 1:
+                identical += 1
+                continue
+
+            drifted += 1
+            dataset_id, table_id = key
+            f.write(f"🔁 {dataset_id}.{table_id}:\n")
+            for path, status, definitions in column_drift({n: columns[n][key] for n in present}):
+                f.write(f"  - {path}: {status} {json.dumps(definitions)}\n")
+                rows_for_bq.append({
+                    "run_time": run_time,
+                    "dataset": dataset_id,
+                    "table_name": table_id,
+                    "column_path": path,
+                    "status": status,
+                    "details": json.dumps(definitions)
+                })
+            f.write("\n")
+
+    # Whole run in one load job; the table is created on first use
+    audit_client = bigquery.Client(project=audit_project)
+    table_ref = f"{audit_project}.{audit_dataset}.{drift_audit_table}"
+    job_config = bigquery.LoadJobConfig(
+        schema=[
+            bigquery.SchemaField("run_time", "TIMESTAMP"),
+            bigquery.SchemaField("dataset", "STRING"),
+            bigquery.SchemaField("table_name", "STRING"),
+            bigquery.SchemaField("column_path", "STRING"),
+            bigquery.SchemaField("status", "STRING"),
+            bigquery.SchemaField("details", "STRING")
+        ],
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED
+    )
+
+    print(f"✅ {identical} tables identical, {drifted} with schema drift")
+    if cache:
+        print(f"🗄️ Schema cache: {cache.summary()}")
+    if rows_for_bq:
+        try:
+            audit_client.load_table_from_json(rows_for_bq, table_ref, job_config=job_config).result()
+            print(f"✅ Exported {len(rows_for_bq)} rows to {table_ref}")
+        except Exception as e:
+            print("Errors while loading:", e)
+    print(f"📄 Schema drift saved to: {drift_output_path}")
+
+def missing_datasets(client, source_project, target_project, datasets, workers=16):
+    """[(dataset, location)] of the `datasets` that `target_project` lacks, located like their source."""
+    def check(dataset_id):
+        try:
+            client.get_dataset(f"{target_project}.{dataset_id}")
+            return None
+        except exceptions.NotFound:
+            return dataset_id, client.get_dataset(f"{source_project}.{dataset_id}").location
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [found for found in pool.map(check, datasets) if found]
+
+def get_table_types(client, project, tables, region=None, workers=16):
+    """{(dataset, table): table_type} of `tables` in `project`, spelled as in INFORMATION_SCHEMA.TABLES.
+
+    With `region` one query covers all of them; otherwise each dataset is queried, in parallel.
+    """
+    def query(source, column, names):
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("tables", "STRING", sorted(names))])
+        sql = f"""
+            SELECT table_schema, table_name, table_type
+            FROM {source}.INFORMATION_SCHEMA.TABLES
+            WHERE {column} IN UNNEST(@tables)
+        """
+        return {(row.table_schema, row.table_name): row.table_type
+                for row in client.query(sql, job_config=job_config).result()}
+
+    if region:
+        try:
+            return query(f"`{project}`.`region-{region}`", "CONCAT(table_schema, '.', table_name)",
+                         [f"{dataset_id}.{table_id}" for dataset_id, table_id in tables])
+        except Exception as e:
+            print(f"⚠️ INFORMATION_SCHEMA table types failed for {project}, querying datasets instead: {e}")
+    by_dataset = defaultdict(list)
+    for dataset_id, table_id in tables:
+        by_dataset[dataset_id].append(table_id)
+    types = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found in pool.map(lambda item: query(f"`{project}.{item[0]}`", "table_name", item[1]),
+                              by_dataset.items()):
+            types.update(found)
+    return types
+
+def start_sync(client, source_project, target_project, key, mode):
+    """Start creating one table in `target_project`: the copy or DDL job to poll, or None when the
+    call itself created the table (schema mode)."""
+    dataset_id, table_id = key
+    source, target = f"{source_project}.{dataset_id}.{table_id}", f"{target_project}.{dataset_id}.{table_id}"
+    if mode == "copy":
+        job_config = bigquery.CopyJobConfig(
+            create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+            write_disposition=bigquery.WriteDisposition.WRITE_EMPTY
+        )
+        return client.copy_table(source, target, job_config=job_config)
+    if mode == "like":
+        return client.query(f"CREATE TABLE `{target}` LIKE `{source}`")
+    table = client.get_table(source)
+    clone = bigquery.Table(target, schema=table.schema)
+    for attribute in ("description", "labels", "time_partitioning", "range_partitioning", "clustering_fields"):
+        setattr(clone, attribute, getattr(table, attribute))
+    client.create_table(clone)
+    return None
+
+def failure_status(reason):
+    """`exists` when the table was created in the target in the meantime, `error` otherwise."""
+    return "exists" if reason == "duplicate" else "error"
+
+def sync_tables(client, source_project, target_project, tables, mode, max_jobs, on_finished, poll=None):
+    """Create `tables` in `target_project`, at most `max_jobs` at a time.
+
+    Jobs are submitted from a pool and every `poll` seconds all running jobs are reloaded in one
+    parallel sweep, instead of blocking on each job's result in turn. `on_finished` gets each sweep's
+    finished tables as (key, status, job_id, details) tuples.
+    """
+    poll = poll_seconds if poll is None else poll
+    done_status = "copied" if mode == "copy" else "created"
+    queue, running = deque(tables), {}
+
+    def start(key):
+        try:
+            return start_sync(client, source_project, target_project, key, mode), None
+        except Exception as e:
+            return None, e
+
+    def reload(job):
+        try:
+            job.reload()
+        except Exception as e:
+            print(f"⚠️ Could not poll job {job.job_id}, retrying: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_jobs) as pool:
+        while queue or running:
+            finished = []
+            batch = [queue.popleft() for _ in range(min(len(queue), max_jobs - len(running)))]
+            for key, (job, error) in zip(batch, pool.map(start, batch)):
+                if error is not None:
+                    reason = "duplicate" if isinstance(error, exceptions.Conflict) else None
+                    finished.append((key, failure_status(reason), None, str(error)))
+                elif job is None:
+                    finished.append((key, done_status, None, ""))
+                else:
+                    running[key] = job
+            if running:
+                time.sleep(poll)
+                list(pool.map(reload, running.values()))
+                for key, job in list(running.items()):
+                    if job.state != "DONE":
+                        continue
+                    del running[key]
+                    if job.error_result:
+                        finished.append((key, failure_status(job.error_result.get("reason")), job.job_id,
+                                         job.error_result.get("message", "")))
+                    else:
+                        finished.append((key, done_status, job.job_id, ""))
+            if finished:
+                on_finished(finished)
+
+def sync(environments, source, target, mode="schema", region=None, workers=16, max_jobs=16, dry_run=False,
+         poll=None):
+    """Create the tables environment `source` has and `target` lacks in `target`, with their datasets."""
+    load_dotenv()
+    audit_project = os.getenv("PROJECT_ID") or environments[0][1]
+    projects = dict(environments)
+    source_project, target_project = projects[source], projects[target]
+
+    inventories = get_inventories([(source, source_project), (target, target_project)], region, workers)
+    tables = sorted(inventories[source] - inventories[target])
+    # Views and other objects without their own data cannot be created from the source's schema or copied
+    types = get_table_types(bigquery.Client(project=source_project), source_project, tables, region, workers)
+    skipped = [(key, types[key]) for key in tables if types.get(key, "BASE TABLE") not in SYNCABLE_TYPES]
+    tables = [key for key in tables if types.get(key, "BASE TABLE") in SYNCABLE_TYPES]
+    client = bigquery.Client(project=target_project)
+    datasets = missing_datasets(client, source_project, target_project, sorted({d for d, _ in tables}), workers)
+
+    plan = [f"{'📝 Plan' if dry_run else '🛠️ Sync'}: {len(tables)} table(s) from {source} ({source_project}) "
+            f"to {target} ({target_project}), {len(skipped)} skipped"]
+    plan += [f"  create dataset {dataset_id} in {location}" for dataset_id, location in datasets]
+    plan += [f"  {SYNC_ACTIONS[mode]}: {dataset_id}.{table_id}" for dataset_id, table_id in tables]
+    plan += [f"  skip {table_type}: {dataset_id}.{table_id}" for (dataset_id, table_id), table_type in skipped]
+    with open(sync_output_path, "w") as f:
+        f.write("\n".join(plan) + "\n")
+    if dry_run:
+        print("\n".join(plan))
+        print(f"📄 Plan saved to: {sync_output_path}")
+        return
+    print(plan[0])
+    if not tables and not skipped:
+        return
+
+    for dataset_id, location in datasets:
+        dataset = bigquery.Dataset(f"{target_project}.{dataset_id}")
+        dataset.location = location
+        client.create_dataset(dataset, exists_ok=True)
+        print(f"🆕 Created dataset {target_project}.{dataset_id} in {location}")
+
+    audit_client = bigquery.Client(project=audit_project)
+    table_ref = f"{audit_project}.{audit_dataset}.{sync_audit_table}"
+    try:
+        audit_client.get_table(table_ref)
+    except exceptions.NotFound:
+        audit_client.create_table(bigquery.Table(table_ref, schema=[
+            bigquery.SchemaField("run_time", "TIMESTAMP"),
+            bigquery.SchemaField("source_project", "STRING"),
+            bigquery.SchemaField("target_project", "STRING"),
+            bigquery.SchemaField("dataset", "STRING"),
+            bigquery.SchemaField("table_name", "STRING"),
+            bigquery.SchemaField("mode", "STRING"),
+            bigquery.SchemaField("status", "STRING"),
+            bigquery.SchemaField("job_id", "STRING"),
+            bigquery.SchemaField("details", "STRING")
+        ]))
+
+    run_time = datetime.utcnow().isoformat()
+    statuses = Counter()
+
+    # Progress reaches the audit table one poll sweep at a time
+    def on_finished(finished):
+        rows_for_bq = []
+        with open(sync_output_path, "a") as f:
+            for (dataset_id, table_id), status, job_id, details in finished:
+                statuses[status] += 1
+                line = f"{status}: {dataset_id}.{table_id}" + (f" ({details})" if details else "")
+                print(f"[{sum(statuses.values())}/{len(tables) + len(skipped)}] {line}")
+                f.write(line + "\n")
+                rows_for_bq.append({
+                    "run_time": run_time,
+                    "source_project": source_project,
+                    "target_project": target_project,
+                    "dataset": dataset_id,
+                    "table_name": table_id,
+                    "mode": mode,
+                    "status": status,
+                    "job_id": job_id,
+                    "details": details
+                })
+        errors = audit_client.insert_rows_json(table_ref, rows_for_bq)
+        if errors:
+            print("Errors while inserting:", errors)
+
+    if skipped:
+        on_finished([(key, "skipped", None, f"{table_type} is not synced") for key, table_type in skipped])
+    sync_tables(client, source_project, target_project, tables, mode, max_jobs, on_finished, poll)
+    print("✅ " + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())))
+    print(f"📄 Sync log saved to: {sync_output_path}; audit rows in {table_ref}")
+
+def cli(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Compare which tables exist in two or more BigQuery projects.")
+    parser.add_argument("environments", nargs="+", metavar="[NAME=]PROJECT",
+                        help="Environments to compare, e.g. preprod=my-preprod-project prod=my-prod-project")
+    parser.add_argument("--region", help="BigQuery region (e.g. us, eu) for a single INFORMATION_SCHEMA.TABLES "
+                                         "query per project; without it datasets are listed in parallel")
+    parser.add_argument("--workers", type=int, default=16, help="Parallel per-dataset calls per project")
+    parser.add_argument("--drift", action="store_true",
+                        help="Compare the columns (including nested fields) of tables found in several environments")
+    parser.add_argument("--sync", metavar="SOURCE:TARGET",
+                        help="Create the tables environment SOURCE has and TARGET lacks in TARGET")
+    parser.add_argument("--sync-mode", choices=sorted(SYNC_ACTIONS), default="schema",
+                        help="schema: empty table with the source's schema, partitioning and clustering (default); "
+                             "like: CREATE TABLE LIKE job; copy: copy job including the data")
+    parser.add_argument("--max-jobs", type=int, default=16, help="Tables being created at once with --sync")
+    parser.add_argument("--dry-run", action="store_true", help="With --sync, write the plan without creating anything")
+    args = parser.parse_args(argv)
+
+    environments = [parse_environment(spec) for spec in args.environments]
+    if len(environments) < 2:
+        parser.error("at least two environments are required")
+    if args.sync:
+        source, _, target = args.sync.partition(":")
+        names = [name for name, _ in environments]
+        if source not in names or target not in names or source == target:
+            parser.error(f"--sync needs two different environments out of {', '.join(names)}")
+        if args.drift:
+            parser.error("--sync and --drift cannot be combined")
+        sync(environments, source, target, args.sync_mode, args.region, args.workers, args.max_jobs, args.dry_run)
+    elif args.drift:
+        schema_drift(environments, args.region, args.workers)
+    else:
+        main(environments, args.region, args.workers)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,26 @@
+"""
+Deferred imports of the heavy dependencies shared by the lake management tools.
+
+`bigquery = lazy_import("google.cloud.bigquery")` binds a stand-in that imports the module the first
+time one of its attributes is used, so `--help`, configuration errors and importing a tool from another
+process do not pay for loading the google-cloud libraries.
+"""
+
+import sys, types, importlib
+
+class LazyModule(types.ModuleType):
+    """Stand-in for the module `__name__`; attribute lookups import it and read from it.
+
+    Lookups are forwarded on every use rather than copied, so patches applied to the real module
+    (as the benchmarks do) are seen. The import lock makes the first import safe from any thread.
+    """
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+def lazy_import(name):
+    """The module `name` if it is already imported, otherwise a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,146 @@
+"""
+On-disk cache of BigQuery table metadata shared by the lake management tools.
+"""
+
+import os, json, time, sqlite3, threading
+
+from .lazy_import import lazy_import
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "lake-management", "schema_cache.sqlite")
+EVICT_EVERY = 100  # puts between LRU size checks
+
+def to_ms(dt):
+    return round(dt.timestamp() * 1000) if dt else None
+
+class SchemaCache:
+    """Table resources (schema, etag, modified, num_rows) keyed by fully-qualified table ID.
+
+    An entry is served while it is younger than `ttl` seconds or, once `note_modified` / `revalidate`
+    has supplied a dataset's last-modified times, while its modified time still matches. The least
+    recently used entries beyond `max_entries` are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=20000, ttl=600):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path, self.max_entries, self.ttl = path, max_entries, ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tables (
+                table_id   TEXT PRIMARY KEY,
+                etag       TEXT,
+                modified   INTEGER,
+                num_rows   INTEGER,
+                resource   TEXT,
+                fetched_at REAL,
+                used_at    REAL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tables_used_at ON tables (used_at)")
+        self.conn.commit()
+        self.modified = {}  # {project.dataset: {table: last_modified_ms}} known in this process
+        self.hits = self.misses = 0
+        self._puts = 0
+
+    @classmethod
+    def from_env(cls):
+        """The cache configured by SCHEMA_CACHE_*, or None when SCHEMA_CACHE_PATH is set to off."""
+        path = os.getenv("SCHEMA_CACHE_PATH", DEFAULT_PATH)
+        if path.lower() in ("", "off", "none", "false"):
+            return None
+        return cls(path,
+                   max_entries=int(os.getenv("SCHEMA_CACHE_MAX_ENTRIES", "20000")),
+                   ttl=float(os.getenv("SCHEMA_CACHE_TTL", "600")))
+
+    @staticmethod
+    def table_id(client, table_id):
+        ref = bigquery.TableReference.from_string(table_id, default_project=client.project)
+        return f"{ref.project}.{ref.dataset_id}.{ref.table_id}"
+
+    def note_modified(self, dataset_ref, modified):
+        """Record {table: last_modified_ms} for `project.dataset`; its entries are validated against it."""
+        with self.lock:
+            self.modified[dataset_ref] = dict(modified)
+
+    def revalidate(self, client, dataset_ref):
+        """One __TABLES__ query for the whole dataset instead of a get_table per table."""
+        rows = client.query(f"SELECT table_id, last_modified_time FROM `{dataset_ref}.__TABLES__`").result()
+        modified = {r.table_id: r.last_modified_time for r in rows}
+        self.note_modified(dataset_ref, modified)
+        return modified
+
+    def cached_tables(self, dataset_ref):
+        """Names of the tables of `project.dataset` that have an entry, current or not."""
+        prefix = dataset_ref + "."
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT table_id FROM tables WHERE substr(table_id, 1, ?) = ?", (len(prefix), prefix)).fetchall()
+        return {table_id[len(prefix):] for table_id, in rows}
+
+    def lookup(self, table_id, ttl=None):
+        """The cached Table if it is still valid, else None. `ttl=0` accepts revalidated entries only."""
+        ttl = self.ttl if ttl is None else ttl
+        dataset_ref, _, table = table_id.rpartition(".")
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT modified, resource, fetched_at FROM tables WHERE table_id = ?", (table_id,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            modified, resource, fetched_at = row
+            known = self.modified.get(dataset_ref)
+            fresh = known.get(table) == modified if known is not None else time.time() - fetched_at < ttl
+            if not fresh:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE tables SET used_at = ? WHERE table_id = ?", (time.time(), table_id))
+            self.conn.commit()
+        return bigquery.Table.from_api_repr(json.loads(resource))
+
+    def put(self, table):
+        table_id = f"{table.project}.{table.dataset_id}.{table.table_id}"
+        modified, now = to_ms(table.modified), time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tables VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (table_id, table.etag, modified, table.num_rows, json.dumps(table.to_api_repr()), now, now))
+            known = self.modified.get(f"{table.project}.{table.dataset_id}")
+            if known is not None:
+                known[table.table_id] = modified
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+            self.conn.commit()
+
+    def invalidate(self, table_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM tables WHERE table_id = ?", (table_id,))
+            self.conn.commit()
+
+    def get_table(self, client, table_id, ttl=None):
+        """Read-through replacement for client.get_table."""
+        table_id = self.table_id(client, table_id)
+        table = self.lookup(table_id, ttl)
+        if table is not None:
+            return table
+        table = client.get_table(table_id)
+        self.put(table)
+        return table
+
+    def _evict(self):
+        self.conn.execute("""
+            DELETE FROM tables WHERE table_id NOT IN (
+                SELECT table_id FROM tables ORDER BY used_at DESC LIMIT ?)""", (self.max_entries,))
+
+    def summary(self):
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+    def close(self):
+        with self.lock:
+            self._evict()
+            self.conn.commit()
+            self.conn.close()
@@ -0,0 +1,1791 @@
+#!/usr/bin/env python3
+"""
+Parallelized BigQuery column description updater with execution timer.
+"""
+
+import os, re, sys, copy, json, time, uuid, heapq, queue, random, hashlib, argparse, itertools, threading, contextlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from .schema_cache import SchemaCache
+from .lazy_import import lazy_import
+
+# Loaded on first use, so --help, --check and importing this module stay fast
+bigquery = lazy_import("google.cloud.bigquery")
+exceptions = lazy_import("google.api_core.exceptions")
+asyncio = lazy_import("asyncio")
+
+try:  # spans are exported when an OpenTelemetry SDK is configured; the bare API is a no-op
+    from opentelemetry import trace
+    tracer = trace.get_tracer("lake-management.updater")
+except ImportError:
+    tracer = None
+
+@dataclass
+class Config:
+    """Settings of one run; the CLI fills them from the environment, api_server from the request."""
+    project_id: Optional[str]
+    metadata_table: Optional[str]
+    job_run_table: Optional[str]
+    sleep_ms: int = 1000               # upper bound on a worker's pause between updates
+    max_workers: int = 5               # upper bound on concurrent updates
+    max_ops_per_sec: float = 50        # global ceiling for metadata updates
+    apply_mode: str = "patch"          # patch | ddl
+    patch_attempts: int = 3
+    prefetch_min_tables: int = 10      # tables per dataset before prefetching pays off
+    prefetch_region: Optional[str] = None  # e.g. region-us: one query for all datasets
+    state_table: Optional[str] = None  # incremental mode: fingerprints in BigQuery ...
+    state_file: Optional[str] = None   # ... or in a local JSON file
+    page_size: int = 10000
+    metadata_rules: bool = False       # metadata rows with name patterns apply to every matching column
+    use_storage_api: bool = False
+    log_sink_mode: str = "stream"      # stream (insertAll) | load (load jobs)
+    log_mode: str = "full"             # full: a row per column | changes: rows for updated/unmatched/error only
+    log_batch_rows: int = 500
+    log_flush_seconds: float = 5
+    log_spill_dir: str = "."
+    engine: str = "threads"            # threads | async
+    max_in_flight: int = 256           # async engine: tables processed at once
+    api_endpoint: Optional[str] = None # e.g. http://localhost:9050 for a local stand-in of the REST API
+    checkpoint_dir: Optional[str] = None  # also keep checkpoints in a local file here
+    max_run_seconds: Optional[float] = None  # stop dispatching tables after this long; resume later
+    resume: Optional[str] = None       # run ID whose completed tables are skipped
+    shard_index: int = 0               # this process handles the tables hashed to shard_index ...
+    shard_count: int = 1               # ... out of shard_count shards
+    full: bool = False                 # ignore stored fingerprints
+    log_file: bool = False             # also write column_updates_<run_id>.log
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Build a Config from environment variables; non-None `overrides` win."""
+        env = os.getenv
+        values = dict(
+            project_id=env("PROJECT_ID"),
+            metadata_table=env("METADATA_TABLE"),
+            job_run_table=env("JOB_RUN_TABLE"),
+            sleep_ms=int(env("SLEEP_MSECONDS", "1000")),
+            max_workers=int(env("MAX_PARALLEL_WORKERS", "5")),
+            max_ops_per_sec=float(env("MAX_OPS_PER_SEC", "50")),
+            apply_mode=env("APPLY_MODE", "patch").lower(),
+            patch_attempts=int(env("PATCH_ATTEMPTS", "3")),
+            prefetch_min_tables=int(env("PREFETCH_MIN_TABLES", "10")),
+            prefetch_region=env("PREFETCH_REGION"),
+            state_table=env("STATE_TABLE"),
+            state_file=env("STATE_FILE"),
+            page_size=int(env("METADATA_PAGE_SIZE", "10000")),
+            metadata_rules=env("METADATA_RULES", "false").lower() == "true",
+            use_storage_api=env("USE_STORAGE_API", "false").lower() == "true",
+            log_sink_mode=env("LOG_SINK_MODE", "stream").lower(),
+            log_mode=env("LOG_MODE", "full").lower(),
+            log_batch_rows=int(env("LOG_BATCH_ROWS", "500")),
+            log_flush_seconds=float(env("LOG_FLUSH_SECONDS", "5")),
+            log_spill_dir=env("LOG_SPILL_DIR", "."),
+            engine=env("ENGINE", "threads").lower(),
+            max_in_flight=int(env("MAX_IN_FLIGHT", "256")),
+            api_endpoint=env("BIGQUERY_API_ENDPOINT"),
+            checkpoint_dir=env("CHECKPOINT_DIR"),
+            max_run_seconds=float(env("MAX_RUN_SECONDS")) if env("MAX_RUN_SECONDS") else None,
+            # Cloud Run jobs number their tasks, so a job with N tasks runs N shards without extra settings.
+            shard_index=int(env("SHARD_INDEX", env("CLOUD_RUN_TASK_INDEX", "0"))),
+            shard_count=int(env("SHARD_COUNT", env("CLOUD_RUN_TASK_COUNT", "1"))),
+        )
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**values)
+
+    def validate(self):
+        if not all([self.project_id, self.metadata_table, self.job_run_table]):
+            raise ValueError("PROJECT_ID / METADATA_TABLE / JOB_RUN_TABLE must be set")
+        if self.apply_mode not in ("patch", "ddl"):
+            raise ValueError("APPLY_MODE must be 'patch' or 'ddl'")
+        if self.log_sink_mode not in ("stream", "load"):
+            raise ValueError("LOG_SINK_MODE must be 'stream' or 'load'")
+        if self.log_mode not in ("full", "changes"):
+            raise ValueError("LOG_MODE must be 'full' or 'changes'")
+        if self.engine not in ("threads", "async"):
+            raise ValueError("ENGINE must be 'threads' or 'async'")
+        if self.shard_count < 1 or not 0 <= self.shard_index < self.shard_count:
+            raise ValueError("SHARD_INDEX must be between 0 and SHARD_COUNT - 1")
+        if self.shard_count > 1 and self.state_file:
+            raise ValueError("STATE_FILE is local to one process; sharded runs need STATE_TABLE")
+
+# BigQuery allows 5 metadata update operations per table every 10 seconds
+TABLE_BURST, TABLE_RATE = 5, 0.5
+RATE_LIMIT_RETRIES = 6
+LOG_RETRIES = 5
+LOG_BATCH_BYTES = 5 * 1024 * 1024  # well below the 10 MB insertAll request limit
+QUEUED_TABLES_PER_WORKER = 4  # backpressure: tables submitted but not yet finished
+API_RETRIES = 5               # async engine: attempts for rate limits, 5xx responses and connection errors
+JOB_POLL_MAX_SEC = 2
+JOB_ERROR_STATUS = {"notFound": 404, "accessDenied": 403, "rateLimitExceeded": 403, "quotaExceeded": 403}
+
+def now_iso(): return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def make_client(cfg):
+    if cfg.api_endpoint:  # a local stand-in for the REST API takes no credentials
+        from google.api_core.client_options import ClientOptions
+        from google.auth.credentials import AnonymousCredentials
+        return bigquery.Client(project=cfg.project_id, credentials=AnonymousCredentials(),
+                               client_options=ClientOptions(api_endpoint=cfg.api_endpoint))
+    return bigquery.Client(project=cfg.project_id)
+
+def is_rate_limited(e):
+    if isinstance(e, exceptions.TooManyRequests):
+        return True
+    return any((err or {}).get("reason") == "rateLimitExceeded" for err in getattr(e, "errors", None) or [])
+
+class TokenBucket:
+    """Token bucket whose reservations may go negative; the caller sleeps off the debt."""
+
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.stamp = capacity, time.monotonic()
+
+    def reserve(self, now):
+        """Take one token and return how long to wait before using it."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class RateLimiter:
+    """Shared AIMD limiter for metadata updates across all worker threads.
+
+    A global token bucket plus one bucket per table pace the calls. A rate-limit error halves the
+    global rate and the number of concurrent updates and retries with jittered exponential backoff;
+    every success adds back a little of both; other errors are raised without changing the pace.
+    `max_rate` and `max_workers` are ceilings, `sleep_ms` sets the slowest pace a worker is ever
+    throttled down to.
+    """
+
+    def __init__(self, max_rate, max_workers, sleep_ms, telemetry=None):
+        self.max_rate, self.max_workers = max_rate, max_workers
+        self.telemetry = telemetry or Telemetry()
+        self.min_rate = min(max_rate, max_workers * 1000 / sleep_ms) if sleep_ms else min(max_rate, 1.0)
+        self.bucket = TokenBucket(max_rate, max(1.0, max_rate))
+        self.tables = {}
+        self.concurrency, self.in_flight, self.successes = max_workers, 0, 0
+        self.ops, self.backoffs, self.started = 0, 0, time.monotonic()
+        self.first_op = None  # time.time() of the first successful update
+        self.cond = threading.Condition()
+
+    def _acquire(self, key):
+        with self.cond:
+            while self.in_flight >= self.concurrency:
+                self.cond.wait()
+            self.in_flight += 1
+            wait = self._reserve(key)
+        if wait:
+            with self.telemetry.phase("sleep"):
+                time.sleep(wait)
+
+    def _reserve(self, key):
+        """Take a global and a per-table token; the caller holds `cond`."""
+        now = time.monotonic()
+        table = self.tables.setdefault(key, TokenBucket(TABLE_RATE, TABLE_BURST))
+        return max(self.bucket.reserve(now), table.reserve(now))
+
+    def _release(self, outcome):
+        """Free a slot; `outcome` is "ok", "throttled" (a rate-limit error) or "failed" (any other error)."""
+        with self.cond:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                self.backoffs += 1
+                self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+                self.concurrency = max(1, self.concurrency // 2)
+                self.successes = 0
+            elif outcome == "ok":
+                self.ops += 1
+                if self.first_op is None:
+                    self.first_op = time.time()
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 50)
+                self.successes += 1
+                if self.successes >= self.concurrency and self.concurrency < self.max_workers:
+                    self.concurrency += 1
+                    self.successes = 0
+            self.cond.notify_all()
+
+    def run(self, key, fn):
+        """Call `fn()` under the limiter, retrying rate-limit errors with backoff."""
+        for attempt in range(1, RATE_LIMIT_RETRIES + 1):
+            self._acquire(key)
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_rate_limited(e)
+                self._release("throttled" if throttled else "failed")
+                if not throttled or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                with self.telemetry.phase("sleep"):
+                    time.sleep(random.uniform(0, min(32, 2 ** attempt)))
+                continue
+            self._release("ok")
+            return result
+
+    def summary(self):
+        with self.cond:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return (f"{self.ops / elapsed:.2f} ops/sec effective, limit {self.bucket.rate:.1f} ops/sec "
+                    f"x {self.concurrency} worker(s), {self.backoffs} backoff(s), "
+                    f"{max(self.bucket.tokens, 0):.1f} token(s) left")
+
+class AsyncRateLimiter(RateLimiter):
+    """RateLimiter for coroutines: waiting for a slot and sleeping happen on the event loop.
+
+    The limiter is made on a runner thread; its Condition is created on first use, on the loop
+    (before Python 3.10 asyncio primitives bind the loop current when they are created).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slots = None
+
+    async def run(self, key, fn):
+        """Await `fn()` under the limiter, retrying rate-limit errors with backoff."""
+        if self.slots is None:
+            self.slots = asyncio.Condition()
+        for attempt in range(1, RATE_LIMIT_RETRIES + 1):
+            async with self.slots:
+                await self.slots.wait_for(lambda: self.in_flight < self.concurrency)
+                with self.cond:
+                    self.in_flight += 1
+                    wait = self._reserve(key)
+            if wait:
+                with self.telemetry.phase("sleep"):
+                    await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as e:
+                throttled = is_rate_limited(e)
+                await self._release_slot("throttled" if throttled else "failed")
+                if not throttled or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                with self.telemetry.phase("sleep"):
+                    await asyncio.sleep(random.uniform(0, min(32, 2 ** attempt)))
+                continue
+            await self._release_slot("ok")
+            return result
+
+    async def _release_slot(self, outcome):
+        self._release(outcome)
+        async with self.slots:
+            self.slots.notify_all()
+
+class RunLog:
+    """Output of one run: printed, optionally appended to a local file, last lines kept in memory."""
+
+    def __init__(self, path=None, echo=True, keep=200):
+        self.path, self.echo = path, echo
+        self.tail = deque(maxlen=keep)
+
+    def __call__(self, msg):
+        if self.echo:
+            print(msg)
+        self.tail.append(msg)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"{now_iso()}  {msg}\n")
+
+def span(name):
+    return tracer.start_as_current_span(name) if tracer else contextlib.nullcontext()
+
+class Telemetry:
+    """Phase timings and BigQuery call latencies of one run.
+
+    Phases and calls are summed over all threads, so the worker phases can add up to more than
+    the run's duration. `listeners` (api_server's Prometheus metrics) get every observation as it
+    happens through `observe(kind, name, value, **labels)`.
+    """
+
+    def __init__(self, listeners=()):
+        self.listeners = list(listeners)
+        self.lock = threading.Lock()
+        self.phases = defaultdict(float)
+        self.calls = defaultdict(list)  # (op, outcome) -> [seconds]
+
+    def notify(self, kind, name, value, **labels):
+        for listener in self.listeners:
+            listener.observe(kind, name, value, **labels)
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] += seconds
+        self.notify("phase", name, seconds)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        with span(name):
+            try:
+                yield
+            finally:
+                self.add_phase(name, time.perf_counter() - start)
+
+    def call(self, op, fn):
+        """Time one BigQuery call `fn()` and record it under `op` with its outcome."""
+        start, outcome = time.perf_counter(), "ok"
+        with span(f"bigquery.{op}"):
+            try:
+                return fn()
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                self._record(op, time.perf_counter() - start, outcome)
+
+    async def call_async(self, op, fn):
+        """call() for a coroutine function."""
+        start, outcome = time.perf_counter(), "ok"
+        with span(f"bigquery.{op}"):
+            try:
+                return await fn()
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                self._record(op, time.perf_counter() - start, outcome)
+
+    def _record(self, op, seconds, outcome):
+        with self.lock:
+            self.calls[(op, outcome)].append(seconds)
+        self.notify("call", op, seconds, outcome=outcome)
+
+    def breakdown(self):
+        """{"phases": {phase: seconds}, "calls": {op: {count, errors, p50_ms, p99_ms, total_sec}}}."""
+        with self.lock:
+            by_op = defaultdict(list)
+            errors = defaultdict(int)
+            for (op, outcome), samples in self.calls.items():
+                by_op[op] += samples
+                if outcome != "ok":
+                    errors[op] += len(samples)
+            calls = {}
+            for op, samples in sorted(by_op.items()):
+                samples.sort()
+                calls[op] = {
+                    "count": len(samples),
+                    "errors": errors[op],
+                    "p50_ms": round(samples[(len(samples) - 1) // 2] * 1000, 1),
+                    "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 1),
+                    "total_sec": round(sum(samples), 3),
+                }
+            return {"phases": {k: round(v, 3) for k, v in sorted(self.phases.items())}, "calls": calls}
+
+class AsyncBigQuery:
+    """The BigQuery REST calls of the async engine (tables.get, tables.patch, jobs.insert/jobs.get)
+    over one pooled httpx.AsyncClient.
+
+    With an `endpoint` the calls go to that stand-in for the API without credentials; otherwise
+    Application Default Credentials are used and refreshed on a thread when they expire. Error
+    responses raise the same google.api_core exceptions as the bigquery client.
+    """
+
+    def __init__(self, endpoint=None, max_connections=256, timeout=60):
+        import httpx  # only the async engine needs it
+        self.root = (endpoint or "https://bigquery.googleapis.com").rstrip("/") + "/bigquery/v2"
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout)
+        self.transport_errors = httpx.TransportError
+        self.credentials = None
+        if not endpoint:
+            import google.auth
+            self.credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/bigquery"])
+        self.auth_lock = None  # created on the loop, see AsyncRateLimiter
+
+    async def _headers(self):
+        if self.credentials is None:
+            return {}
+        if self.auth_lock is None:
+            self.auth_lock = asyncio.Lock()
+        async with self.auth_lock:
+            if not self.credentials.valid:
+                from google.auth.transport.requests import Request
+                await asyncio.to_thread(self.credentials.refresh, Request())
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def request(self, method, path, body=None, headers=None, params=None):
+        """Send one API request and return its JSON, retrying like the bigquery client's default retry."""
+        for attempt in range(1, API_RETRIES + 1):
+            try:
+                resp = await self.http.request(method, self.root + path, json=body, params=params,
+                                               headers={**await self._headers(), **(headers or {})})
+            except self.transport_errors:
+                if attempt == API_RETRIES:
+                    raise
+            else:
+                if resp.status_code < 400:
+                    return resp.json()
+                try:
+                    error = resp.json()["error"]
+                except (ValueError, KeyError, TypeError):
+                    error = {"message": resp.text}
+                e = exceptions.from_http_status(resp.status_code, error.get("message", ""), errors=error.get("errors", []))
+                if attempt == API_RETRIES or not (resp.status_code >= 500 or is_rate_limited(e)):
+                    raise e
+            await asyncio.sleep(random.uniform(0, 2 ** attempt))
+
+    @staticmethod
+    def _path(table_ref):
+        project, dataset, table = table_ref.split(".")
+        return f"/projects/{project}/datasets/{dataset}/tables/{table}"
+
+    async def get_table(self, table_ref):
+        return bigquery.Table.from_api_repr(await self.request("GET", self._path(table_ref)))
+
+    async def patch_schema(self, table):
+        """tables.patch of the schema, guarded by the table's etag like client.update_table."""
+        table_ref = f"{table.project}.{table.dataset_id}.{table.table_id}"
+        body = {"schema": {"fields": [f.to_api_repr() for f in table.schema]}}
+        headers = {"If-Match": table.etag} if table.etag else None
+        return bigquery.Table.from_api_repr(await self.request("PATCH", self._path(table_ref), body, headers))
+
+    async def query(self, project, sql, params=()):
+        """jobs.insert a query, poll jobs.get until it is done and return the job resource."""
+        job_id = f"updater_{uuid.uuid4().hex}"
+        body = {
+            "jobReference": {"projectId": project, "jobId": job_id},
+            "configuration": {"query": {
+                "query": sql,
+                "useLegacySql": False,
+                "parameterMode": "NAMED",
+                "queryParameters": [p.to_api_repr() for p in params],
+            }},
+        }
+        job = await self.request("POST", f"/projects/{project}/jobs", body)
+        delay = 0.1
+        while job["status"]["state"] != "DONE":
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, JOB_POLL_MAX_SEC)
+            location = job["jobReference"].get("location")
+            job = await self.request("GET", f"/projects/{project}/jobs/{job_id}",
+                                     params={"location": location} if location else None)
+        err = job["status"].get("errorResult")
+        if err:
+            raise exceptions.from_http_status(JOB_ERROR_STATUS.get(err.get("reason"), 400), err.get("message", ""),
+                                   errors=job["status"].get("errors") or [err])
+        return job
+
+    async def aclose(self):
+        await self.http.aclose()
+
+class LoopPool:
+    """Executor-like front for running table coroutines on an asyncio event loop.
+
+    submit() returns a concurrent.futures.Future, so the dispatch loop of a run waits on coroutine
+    tables exactly as on thread-pool ones; at most `limit` of them run at once. Without a `loop`
+    (api_server passes its own) a private loop runs on a background thread for the pool's lifetime.
+    """
+
+    def __init__(self, loop=None, limit=256):
+        self.own = loop is None
+        self.loop = asyncio.new_event_loop() if self.own else loop
+        self.limit, self.semaphore = limit, None
+        self.futures = set()
+        if self.own:
+            self.thread = threading.Thread(target=self.loop.run_forever, name="updater-loop", daemon=True)
+            self.thread.start()
+
+    def submit(self, fn, *args):
+        future = asyncio.run_coroutine_threadsafe(self._bounded(fn, *args), self.loop)
+        self.futures.add(future)
+        future.add_done_callback(self.futures.discard)
+        return future
+
+    async def _bounded(self, fn, *args):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.limit)
+        async with self.semaphore:
+            return await fn(*args)
+
+    def run(self, coro):
+        """Run `coro` on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for future in list(self.futures):
+            future.cancel()
+        if self.own:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+def flatten_fields(fields, prefix=""):
+    """Map lower-cased column paths (`parent.child` for RECORD sub-fields) to schema fields."""
+    out = {}
+    for f in fields:
+        path = f"{prefix}{f.name}"
+        out[path.lower()] = f
+        if f.fields:
+            out.update(flatten_fields(f.fields, f"{path}."))
+    return out
+
+def apply_descriptions(schema, changes):
+    """Return a copy of `schema` with `changes` ({lower-cased path: description}) applied."""
+    def rewrite(fields, prefix):
+        for f in fields:
+            path = f"{prefix}{f['name']}"
+            if path.lower() in changes:
+                f["description"] = changes[path.lower()]
+            if f.get("fields"):
+                rewrite(f["fields"], f"{path}.")
+    api_fields = copy.deepcopy([f.to_api_repr() for f in schema])  # to_api_repr() is not a copy
+    rewrite(api_fields, "")
+    return [bigquery.SchemaField.from_api_repr(f) for f in api_fields]
+
+def describe_schema(schema):
+    """Map lower-cased column paths to their current descriptions."""
+    return {path: f.description for path, f in flatten_fields(schema).items()}
+
+def classify_columns(current, columns):
+    """Split `columns` into {col: status} for unmatched/skipped ones and a list of changed (col, desc).
+
+    `current` maps lower-cased column paths to their current descriptions.
+    """
+    statuses, changed = {}, []
+    for col, desc in columns:
+        if col.lower() not in current:
+            statuses[col] = "unmatched"
+        elif (current[col.lower()] or "").strip() == desc:
+            statuses[col] = "skipped"
+        else:
+            changed.append((col, desc))
+    return statuses, changed
+
+def shard_suffix(cfg):
+    """File name suffix keeping the local files of shards sharing a run ID apart."""
+    return f"_shard{cfg.shard_index}" if cfg.shard_count > 1 else ""
+
+JOB_LOG_COLUMNS = [
+    ("job_run_id", "STRING"),
+    ("timestamp", "TIMESTAMP"),
+    ("status", "STRING"),
+    ("table_name", "STRING"),
+    ("column_name", "STRING"),
+    ("column_metadata", "STRING"),
+    ("target_dataset", "STRING"),
+]
+
+def ensure_job_log_table(client, cfg, write):
+    """Create the job run table if it is missing: partitioned by day and clustered by table, so audit
+    queries over a date range and a dataset or table only read what they need."""
+    try:
+        table = client.get_table(cfg.job_run_table)
+    except exceptions.NotFound:
+        table = bigquery.Table(bigquery.TableReference.from_string(cfg.job_run_table, cfg.project_id),
+                               schema=[bigquery.SchemaField(name, kind) for name, kind in JOB_LOG_COLUMNS])
+        table.time_partitioning = bigquery.TimePartitioning(type_=bigquery.TimePartitioningType.DAY, field="timestamp")
+        table.clustering_fields = ["target_dataset", "table_name"]
+        try:
+            client.create_table(table)
+            write(f"🆕 Created {cfg.job_run_table}, partitioned by day and clustered by dataset and table")
+        except Exception as e:
+            write(f"⚠️ Could not create {cfg.job_run_table}: {e}")
+        return
+    except Exception as e:
+        write(f"⚠️ Could not read {cfg.job_run_table}: {e}")
+        return
+    if table.time_partitioning is None:
+        write(f"💡 {cfg.job_run_table} is not partitioned; see the readme to recreate it partitioned by day")
+
+def spill_path(cfg, run_id):
+    return os.path.join(cfg.log_spill_dir, f"job_log_spill_{run_id}{shard_suffix(cfg)}.ndjson")
+
+def checkpoint_path(cfg, run_id):
+    if not cfg.checkpoint_dir:
+        return None
+    return os.path.join(cfg.checkpoint_dir, f"checkpoint_{run_id}{shard_suffix(cfg)}.ndjson")
+
+class JobLogSink:
+    """Background writer for job-log rows.
+
+    Workers put() rows; a thread flushes them in chunks bounded by `log_batch_rows`, LOG_BATCH_BYTES and
+    `log_flush_seconds`. Rows the insert API rejects are retried individually (with stable insert IDs),
+    and whatever still fails after LOG_RETRIES attempts is appended to a local NDJSON spill file so
+    the audit trail survives a BigQuery outage or a crash later in the run.
+    """
+
+    def __init__(self, client, cfg, run_id, write, telemetry=None):
+        self.client, self.cfg, self.write = client, cfg, write
+        self.telemetry = telemetry or Telemetry()
+        self.table = cfg.job_run_table
+        self.spill_path = spill_path(cfg, run_id)
+        self.checkpoint_path = checkpoint_path(cfg, run_id)
+        self.queue = queue.Queue(maxsize=cfg.log_batch_rows * 10)
+        self.written = self.batches = self.retried = self.spilled = 0
+        self.unavailable = False  # after one exhausted retry loop, later batches get a single attempt
+        self.thread = threading.Thread(target=self._run, name="job-log-sink", daemon=True)
+        self.thread.start()
+
+    def put(self, *rows):
+        """Queue rows for writing; waits while the queue is full."""
+        for row in rows:
+            self.queue.put(row)
+
+    def close(self):
+        """Flush everything still queued and return a one-line summary."""
+        self.queue.put(None)
+        self.thread.join()
+        msg = f"{self.written} row(s) written in {self.batches} batch(es), {self.retried} retried"
+        if self.spilled:
+            msg += f", ⚠️ {self.spilled} spilled to {self.spill_path}"
+        return msg
+
+    def _run(self):
+        batch, size, done = [], 0, False
+        deadline = time.monotonic() + self.cfg.log_flush_seconds
+        while not done:
+            try:
+                row = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if row is None:
+                    done = True
+                else:
+                    batch.append(row)
+                    size += len(json.dumps(row))
+            except queue.Empty:
+                pass
+            if done or len(batch) >= self.cfg.log_batch_rows or size >= LOG_BATCH_BYTES or time.monotonic() >= deadline:
+                if batch:
+                    self._flush(batch)
+                batch, size = [], 0
+                deadline = time.monotonic() + self.cfg.log_flush_seconds
+
+    def _flush(self, rows):
+        self.batches += 1
+        with self.telemetry.phase("job_log_insert"):
+            if self.cfg.log_sink_mode == "load":
+                pending = self._load(rows)
+            else:
+                pending = self._stream(rows)
+        if pending:
+            self.spilled += len(pending)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in pending:
+                    f.write(json.dumps(row) + "\n")
+        checkpoints = [row for row in rows if row["status"] == "checkpoint"]
+        if self.checkpoint_path and checkpoints:
+            # Written after the batch, so a table is only marked done once its column rows went out.
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                for row in checkpoints:
+                    f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _stream(self, rows):
+        ids = [str(uuid.uuid4()) for _ in rows]
+        attempts = 1 if self.unavailable else LOG_RETRIES
+        for attempt in range(1, attempts + 1):
+            try:
+                errors = self.telemetry.call(
+                    "insert_rows_json", lambda: self.client.insert_rows_json(self.table, rows, row_ids=ids))
+            except Exception as e:
+                if attempt == attempts:
+                    self.write(f"⚠️ Job log insert failed: {e}")
+                    self.unavailable = True
+                    return rows
+                time.sleep(random.uniform(0, min(30, 2 ** attempt)))
+                continue
+            self.unavailable = False
+            failed = sorted({err["index"] for err in errors})
+            self.written += len(rows) - len(failed)
+            if not failed:
+                return []
+            if attempt == LOG_RETRIES:
+                self.write(f"⚠️ {len(failed)} job log row(s) rejected: {errors[0].get('errors')}")
+                return [rows[i] for i in failed]
+            self.retried += len(failed)
+            rows, ids = [rows[i] for i in failed], [ids[i] for i in failed]
+            time.sleep(random.uniform(0, min(30, 2 ** attempt)))
+        return rows
+
+    def _load(self, rows):
+        cfg = bigquery.LoadJobConfig(write_disposition=bigquery.WriteDisposition.WRITE_APPEND)
+        attempts = 1 if self.unavailable else LOG_RETRIES
+        for attempt in range(1, attempts + 1):
+            try:
+                self.telemetry.call(
+                    "load_table_from_json", lambda: self.client.load_table_from_json(rows, self.table, job_config=cfg).result())
+                self.written += len(rows)
+                self.unavailable = False
+                return []
+            except Exception as e:
+                if attempt == attempts:
+                    self.write(f"⚠️ Job log load failed: {e}")
+                    self.unavailable = True
+                    return rows
+                self.retried += len(rows)
+                time.sleep(random.uniform(0, min(30, 2 ** attempt)))
+        return rows
+
+def shard_filter(cfg, dataset_col="target_dataset_name", table_col="table_name"):
+    """SQL condition keeping the metadata rows of this process's shard.
+
+    Tables are assigned by FARM_FINGERPRINT of `dataset.table`, which is stable across runs and
+    instances, so shards of one run split the tables without talking to each other.
+    """
+    if cfg.shard_count == 1:
+        return "TRUE"
+    n = cfg.shard_count
+    return f"MOD(MOD(FARM_FINGERPRINT(CONCAT({dataset_col}, '.', {table_col})), {n}) + {n}, {n}) = {cfg.shard_index}"
+
+# Metadata rows whose dataset, table or column name is a glob (`*`, `?`) or a regular expression (`re:`)
+RULE_ROW = "REGEXP_CONTAINS(CONCAT(target_dataset_name, '/', table_name, '/', column_name), r'[*?]|(^|/)re:')"
+
+def explicit_rows(cfg):
+    """SQL condition leaving out the rule rows, which `metadata_rules` runs read separately."""
+    return f"NOT {RULE_ROW}" if cfg.metadata_rules else "TRUE"
+
+def is_pattern(name):
+    return name.startswith("re:") or "*" in name or "?" in name
+
+def pattern_regex(name):
+    """Regular expression source for one pattern name: the text after `re:`, or a translated glob."""
+    if name.startswith("re:"):
+        return name[3:]
+    return "".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in name)
+
+MATCH_MEMO_SIZE = 100_000  # remembered column names per compiled rule matcher
+
+class RuleSet:
+    """Metadata rules compiled for matching a whole lake's columns in memory.
+
+    A rule is a metadata row whose dataset, table or column name is a pattern: `*` and `?` globs
+    (`*` also matches the dots of nested field paths) or a regular expression after `re:`, matched
+    against the whole name. Column names match case-insensitively, dataset and table names exactly.
+    When several rules match a column the most specific wins: an exact column name beats a column
+    pattern, then an exact table name beats a table pattern, then an exact dataset name; remaining
+    ties go to the patterns with more literal characters, then to the first in metadata table order.
+    Explicit metadata rows beat every rule.
+
+    Rules are narrowed down per dataset and per table once; each distinct set of applicable rules is
+    compiled into a hash index of exact column names plus one regular expression alternating the
+    column patterns in precedence order, so matching a column is a dict lookup and at most one regex
+    match, and a name seen before in tables with the same rules only the lookup.
+    """
+
+    def __init__(self, rows):
+        self.rules, self.invalid = [], []
+        for order, (ds, tb, col, desc) in enumerate(rows):
+            try:
+                rule = {
+                    "dataset": self._part(ds), "table": self._part(tb), "column": col, "description": desc.strip(),
+                    "column_regex": pattern_regex(col) if is_pattern(col) else None,
+                }
+                if rule["column_regex"] is not None:
+                    re.compile(f"(?P<r0>{rule['column_regex']})", re.IGNORECASE)
+            except re.error as e:
+                self.invalid.append((f"{ds}.{tb}.{col}", str(e)))
+                continue
+            literals = sum(len(re.sub(r"[*?]|\\.|[.^$+(){}\[\]|]", "", n.removeprefix("re:")))
+                           for n in (ds, tb, col) if is_pattern(n))
+            rule["rank"] = (is_pattern(col), is_pattern(tb), is_pattern(ds), -literals, order)
+            self.rules.append(rule)
+        self.rules.sort(key=lambda r: r["rank"])
+        self.dataset_patterns = any(isinstance(r["dataset"], re.Pattern) for r in self.rules)
+        self.dataset_names = sorted({r["dataset"] for r in self.rules if isinstance(r["dataset"], str)})
+        self._by_dataset, self._matchers = {}, {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    @staticmethod
+    def _part(name):
+        """An exact name as is, a pattern compiled."""
+        return re.compile(pattern_regex(name)) if is_pattern(name) else name
+
+    @staticmethod
+    def _matches(part, name):
+        return part == name if isinstance(part, str) else part.fullmatch(name) is not None
+
+    def for_dataset(self, dataset):
+        """Indexes (in precedence order) of the rules whose dataset part matches `dataset`."""
+        ids = self._by_dataset.get(dataset)
+        if ids is None:
+            ids = self._by_dataset[dataset] = [i for i, r in enumerate(self.rules) if self._matches(r["dataset"], dataset)]
+        return ids
+
+    def table_names(self, dataset):
+        """Exact table names the rules of `dataset` name, or None when one of them has a table pattern."""
+        parts = [self.rules[i]["table"] for i in self.for_dataset(dataset)]
+        return None if any(isinstance(p, re.Pattern) for p in parts) else sorted(set(parts))
+
+    def matcher(self, dataset, table):
+        """A function from a column path of `dataset.table` to its rule description (None when no rule
+        matches), or None when no rule applies to the table at all."""
+        ids = tuple(i for i in self.for_dataset(dataset) if self._matches(self.rules[i]["table"], table))
+        if not ids:
+            return None
+        match = self._matchers.get(ids)
+        if match is None:
+            match = self._matchers[ids] = self._compile(ids)
+        return match
+
+    def _compile(self, ids):
+        exact, patterns = {}, []
+        for i in ids:
+            rule = self.rules[i]
+            if rule["column_regex"] is None:
+                exact.setdefault(rule["column"].lower(), rule["description"])
+            else:
+                patterns.append(i)
+        combined = re.compile("|".join(f"(?P<r{i}>{self.rules[i]['column_regex']})" for i in patterns),
+                              re.IGNORECASE) if patterns else None
+        rules, memo = self.rules, {}  # column names repeat across a lake's tables; remember the answers
+
+        def match(path):
+            key = path.lower()
+            if key in memo:
+                return memo[key]
+            description = exact.get(key)
+            if description is None and combined is not None:
+                m = combined.fullmatch(path)
+                if m:
+                    description = rules[int(m.lastgroup[1:])]["description"]
+            if len(memo) < MATCH_MEMO_SIZE:
+                memo[key] = description
+            return description
+        return match
+
+def load_rules(client, cfg, write):
+    """The metadata table's rule rows as a RuleSet; rules that do not compile are reported and left out."""
+    sql = f"""
+        SELECT target_dataset_name AS dataset_name,
+               table_name, column_name, column_metadata AS description
+        FROM `{cfg.metadata_table}`
+        WHERE column_metadata IS NOT NULL AND {RULE_ROW}
+        ORDER BY dataset_name, table_name, column_name
+    """
+    rules = RuleSet([(r.dataset_name, r.table_name, r.column_name, r.description) for r in client.query(sql).result()])
+    for name, error in rules.invalid:
+        write(f"⚠️ Ignoring metadata rule {name}: {error}")
+    return rules
+
+def rule_table_groups(client, cfg, rules, write, on_inventory=None, telemetry=None):
+    """Yield ((dataset, table), [(column path, description)]) for the columns the rules match, in the
+    (dataset, table) order of stream_table_groups().
+
+    Each dataset's columns come from one COLUMN_FIELD_PATHS query, limited to this shard's tables and,
+    when no rule of the dataset has a table pattern, to the tables the rules name. A dataset that is
+    missing or not readable is reported and skipped. `on_inventory` gets the {table: {path: current
+    description}} of each dataset read in full, before its groups are yielded.
+    """
+    telemetry = telemetry or Telemetry()
+    if rules.dataset_patterns:
+        available = [d.dataset_id for d in client.list_datasets(project=cfg.project_id)]
+    else:
+        available = rules.dataset_names
+    for ds in sorted(d for d in available if rules.for_dataset(d)):
+        tables = rules.table_names(ds)
+        sql = f"""
+            SELECT table_name, field_path, description
+            FROM `{cfg.project_id}.{ds}`.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS
+            WHERE {shard_filter(cfg, "table_schema", "table_name")}
+        """ + ("AND table_name IN UNNEST(@tables)" if tables is not None else "")
+        job_cfg = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("tables", "STRING", tables)] if tables is not None else [])
+        inventory = defaultdict(dict)
+        with telemetry.phase("rule_inventory"):
+            try:
+                result = telemetry.call("rule_inventory", lambda: client.query(sql, job_config=job_cfg).result(
+                    page_size=cfg.page_size))
+                for r in result:
+                    inventory[r.table_name][r.field_path] = r.description
+            except (exceptions.NotFound, exceptions.Forbidden) as e:
+                write(f"⚠️ Rules skipped for dataset {cfg.project_id}.{ds}: {e}")
+                continue
+        if on_inventory and tables is None:
+            on_inventory(ds, inventory)
+
+        groups = []
+        with telemetry.phase("rule_matching"):
+            for tb in sorted(inventory):
+                match = rules.matcher(ds, tb)
+                if match is None:
+                    continue
+                columns = [(path, d) for path, d in ((p, match(p)) for p in inventory[tb]) if d is not None]
+                if columns:
+                    groups.append(((ds, tb), columns))
+        write(f"📐 Rules matched {sum(len(c) for _, c in groups)} column(s) in {len(groups)} table(s) of {ds}")
+        yield from groups
+
+def merge_table_groups(explicit, derived):
+    """Merge two (dataset, table)-ordered streams of table groups; explicit columns win over rule matches."""
+    tagged = heapq.merge(((key, 0, cols) for key, cols in explicit), ((key, 1, cols) for key, cols in derived),
+                         key=lambda g: g[:2])
+    for key, groups in itertools.groupby(tagged, key=lambda g: g[0]):
+        columns, seen = [], set()
+        for _, _, cols in groups:
+            for col, desc in cols:
+                if col.lower() not in seen:
+                    seen.add(col.lower())
+                    columns.append((col, desc))
+        yield key, columns
+
+def stream_table_groups(client, cfg, write, telemetry=None):
+    """Yield ((dataset, table), [(column, description)]) from the metadata table, one table at a time.
+
+    Rows arrive page by page (or as Arrow batches over the Storage Read API when `use_storage_api` is
+    set) ordered by dataset and table, so only the current table's columns are held in memory.
+    With `shard_count` > 1 only the tables of shard `shard_index` are read.
+    Time spent reading and grouping rows, not counting the consumer's time between tables, is
+    recorded as the `grouping` phase.
+    """
+    telemetry = telemetry or Telemetry()
+    sql = f"""
+        SELECT target_dataset_name AS dataset_name,
+               table_name, column_name, column_metadata AS description
+        FROM `{cfg.metadata_table}`
+        WHERE column_metadata IS NOT NULL AND {shard_filter(cfg)} AND {explicit_rows(cfg)}
+        ORDER BY dataset_name, table_name
+    """
+    with telemetry.phase("metadata_query"):
+        result = telemetry.call("metadata_query", lambda: client.query(sql).result(page_size=cfg.page_size))
+
+    def rows():
+        if cfg.use_storage_api:
+            try:
+                from google.cloud import bigquery_storage
+            except ImportError:
+                write("⚠️ google-cloud-bigquery-storage is not installed, reading pages over REST")
+            else:
+                names = ("dataset_name", "table_name", "column_name", "description")
+                for batch in result.to_arrow_iterable(bqstorage_client=bigquery_storage.BigQueryReadClient()):
+                    yield from zip(*(batch.column(n).to_pylist() for n in names))
+                return
+        for r in result:
+            yield r.dataset_name, r.table_name, r.column_name, r.description
+
+    key, columns = None, []
+    started = time.perf_counter()
+    for ds, tb, col, desc in rows():
+        if (ds, tb) != key:
+            if columns:
+                telemetry.add_phase("grouping", time.perf_counter() - started)
+                yield key, columns
+                started = time.perf_counter()
+            key, columns = (ds, tb), []
+        columns.append((col, desc.strip()))
+    telemetry.add_phase("grouping", time.perf_counter() - started)
+    if columns:
+        yield key, columns
+
+def dataset_tables(client, cfg):
+    """Return {dataset: [tables with metadata]}, used to decide which datasets are worth prefetching."""
+    sql = f"""
+        SELECT target_dataset_name AS dataset_name, ARRAY_AGG(DISTINCT table_name) AS tables
+        FROM `{cfg.metadata_table}`
+        WHERE column_metadata IS NOT NULL AND {shard_filter(cfg)} AND {explicit_rows(cfg)}
+        GROUP BY dataset_name
+    """
+    return {r.dataset_name: list(r.tables) for r in client.query(sql).result()}
+
+def prefetch_dataset(client, cfg, dataset, tables):
+    """Bulk-load the current descriptions of `tables` in one dataset from COLUMN_FIELD_PATHS.
+
+    The table names come from dataset_tables() rather than a join with the metadata table, which
+    may live in another region. Returns {table: {lower-cased path: description}}.
+    """
+    sql = f"""
+        SELECT table_name, field_path, description
+        FROM `{cfg.project_id}.{dataset}`.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS
+        WHERE table_name IN UNNEST(@tables)
+    """
+    job_cfg = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("tables", "STRING", sorted(tables))])
+    index = defaultdict(dict)
+    for r in client.query(sql, job_config=job_cfg).result():
+        index[r.table_name][r.field_path.lower()] = r.description
+    return dict(index)
+
+def prefetch_region(client, cfg, tables):
+    """Like prefetch_dataset() for several datasets at once with a single `prefetch_region` query.
+
+    `tables` is {dataset: [tables]}. Returns {dataset: {table: {lower-cased path: description}}}.
+    """
+    sql = f"""
+        SELECT table_schema, table_name, field_path, description
+        FROM `{cfg.project_id}.{cfg.prefetch_region}`.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS
+        WHERE table_schema IN UNNEST(@datasets)
+          AND CONCAT(table_schema, '.', table_name) IN UNNEST(@tables)
+    """
+    job_cfg = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ArrayQueryParameter("datasets", "STRING", sorted(tables)),
+        bigquery.ArrayQueryParameter("tables", "STRING", sorted(f"{ds}.{tb}" for ds, t in tables.items() for tb in t)),
+    ])
+    index = {ds: defaultdict(dict) for ds in tables}
+    for r in client.query(sql, job_config=job_cfg).result():
+        index[r.table_schema][r.table_name][r.field_path.lower()] = r.description
+    return {ds: dict(t) for ds, t in index.items()}
+
+def descriptions_hash(columns):
+    """Stable hash of the desired (column, description) pairs of one table."""
+    payload = "\n".join(f"{c.lower()}\t{d}" for c, d in sorted(columns, key=lambda cd: cd[0].lower()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def to_ms(dt):
+    return round(dt.timestamp() * 1000) if dt else None
+
+def fetch_modified_times(client, cfg, dataset):
+    """Return {table: last_modified_ms} from the dataset's __TABLES__ meta-table."""
+    rows = client.query(f"SELECT table_id, last_modified_time FROM `{cfg.project_id}.{dataset}.__TABLES__`").result()
+    return {r.table_id: r.last_modified_time for r in rows}
+
+def load_fingerprints(client, cfg):
+    """Return {(dataset, table): fingerprint} recorded by previous runs."""
+    if cfg.state_table:
+        sql = f"""
+            SELECT target_dataset, table_name, fingerprint
+            FROM `{cfg.state_table}`
+            WHERE TRUE
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY target_dataset, table_name ORDER BY recorded_at DESC) = 1
+        """
+        try:
+            return {(r.target_dataset, r.table_name): r.fingerprint for r in client.query(sql).result()}
+        except exceptions.NotFound:
+            return {}
+    if os.path.exists(cfg.state_file):
+        with open(cfg.state_file, encoding="utf-8") as f:
+            return {tuple(k.split(".", 1)): v for k, v in json.load(f).items()}
+    return {}
+
+def save_fingerprints(client, cfg, run_id, fingerprints, changed):
+    """Persist fingerprints; the state table is append-only and only receives the `changed` keys."""
+    if cfg.state_table:
+        if not changed:
+            return
+        try:
+            client.get_table(cfg.state_table)
+        except exceptions.NotFound:
+            client.create_table(bigquery.Table(bigquery.TableReference.from_string(cfg.state_table, cfg.project_id), schema=[
+                bigquery.SchemaField("target_dataset", "STRING"),
+                bigquery.SchemaField("table_name", "STRING"),
+                bigquery.SchemaField("fingerprint", "STRING"),
+                bigquery.SchemaField("job_run_id", "STRING"),
+                bigquery.SchemaField("recorded_at", "TIMESTAMP"),
+            ]))
+        ts = now_iso()
+        rows = [{"target_dataset": ds, "table_name": tb, "fingerprint": fingerprints[(ds, tb)],
+                 "job_run_id": run_id, "recorded_at": ts} for ds, tb in changed]
+        errors = client.insert_rows_json(cfg.state_table, rows)
+        if errors:
+            raise RuntimeError(f"{len(errors)} row(s) rejected: {errors[0].get('errors')}")
+        return
+    tmp = f"{cfg.state_file}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({f"{ds}.{tb}": fp for (ds, tb), fp in sorted(fingerprints.items())}, f, indent=0)
+    os.replace(tmp, cfg.state_file)
+
+def load_checkpoints(client, cfg, run_id, write):
+    """Return {(dataset, table): checkpoint} for the tables `run_id` completed without errors.
+
+    Checkpoints are job-log rows with status `checkpoint` (column_metadata holds the table's stats
+    and fingerprint as JSON). They are read from the job run table, the run's spill file and, with
+    `checkpoint_dir`, the local checkpoint file, so a resume works when any of them is available.
+    Shards share the run ID, so only the checkpoints of this process's shard are returned. A table
+    whose checkpoint has errors is not complete: the resume processes it again, and its columns
+    that were updated then count as skipped.
+    """
+    rows = []
+    sql = f"""
+        SELECT target_dataset, table_name, column_metadata
+        FROM `{cfg.job_run_table}`
+        WHERE job_run_id = @run_id AND status = 'checkpoint'
+    """
+    job_cfg = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("run_id", "STRING", run_id)])
+    try:
+        rows += [dict(r.items()) for r in client.query(sql, job_config=job_cfg).result()]
+    except Exception as e:
+        write(f"⚠️ Could not read checkpoints from {cfg.job_run_table}: {e}")
+    for path in (spill_path(cfg, run_id), checkpoint_path(cfg, run_id)):
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                rows += [r for r in map(json.loads, f) if r.get("status") == "checkpoint"]
+    checkpoints, failed = {}, set()
+    for r in rows:
+        key, checkpoint = (r["target_dataset"], r["table_name"]), json.loads(r["column_metadata"])
+        if checkpoint.get("shard", 0) != cfg.shard_index:
+            continue
+        if checkpoint.get("error"):
+            failed.add(key)
+        else:
+            checkpoints[key] = checkpoint
+    if failed - checkpoints.keys():
+        write(f"↩️ Retrying {len(failed - checkpoints.keys())} table(s) that had errors")
+    return checkpoints
+
+def drive(steps, call):
+    """Run a table generator to completion, answering each request it yields with `call(*request)`.
+
+    Exceptions raised by `call` are thrown back into the generator; its return value is returned.
+    """
+    result, error = None, None
+    while True:
+        try:
+            request = steps.throw(error) if error else steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = call(*request), None
+        except Exception as e:
+            result, error = None, e
+
+async def drive_async(steps, call):
+    """drive() with a coroutine function answering the requests."""
+    result, error = None, None
+    while True:
+        try:
+            request = steps.throw(error) if error else steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = await call(*request), None
+        except Exception as e:
+            result, error = None, e
+
+class UpdateRun:
+    """The state of one update_column_descriptions() run and the steps it goes through.
+
+    start() reads what the run needs before its first table (fingerprints, checkpoints, the
+    prefetch plan and rules), execute() streams the metadata's tables to the workers, which run
+    process_table(), and finish() stores the fingerprints, prints the summary and returns it.
+    """
+
+    def __init__(self, cfg, client, run_id, write, progress, cache, telemetry, api=None, loop=None):
+        self.cfg, self.client, self.run_id, self.write = cfg, client, run_id, write
+        self.progress, self.cache, self.telemetry, self.loop = progress, cache, telemetry, loop
+        self.start_time = time.time()
+        self.stats = {"updated": 0, "skipped": 0, "unmatched": 0, "error": 0}
+        self.shard = {"shard": cfg.shard_index} if cfg.shard_count > 1 else {}
+
+        # Incremental mode: skip tables whose desired descriptions and last-modified time match the last run.
+        self.incremental = bool(cfg.state_table or cfg.state_file)
+        self.fingerprints, self.fingerprinted = {}, []
+        self.completed = {}  # resumed tables: {(dataset, table): checkpoint}
+        self.modified = {}   # {dataset: {table: last_modified_ms}}, filled as datasets stream in
+        self.prefetched, self.to_prefetch, self.prefetch_queries = {}, {}, 0
+        self.rules = None
+
+        self.own_api = cfg.engine == "async" and api is None
+        if cfg.engine == "async":
+            self.api = api or AsyncBigQuery(cfg.api_endpoint, max_connections=cfg.max_in_flight)
+            self.limiter = AsyncRateLimiter(cfg.max_ops_per_sec, cfg.max_in_flight, cfg.sleep_ms, telemetry)
+            self.slots, self.max_queued = cfg.max_in_flight, cfg.max_in_flight * 2
+        else:
+            self.api = None
+            self.limiter = RateLimiter(cfg.max_ops_per_sec, cfg.max_workers, cfg.sleep_ms, telemetry)
+            self.slots, self.max_queued = cfg.max_workers, cfg.max_workers * QUEUED_TABLES_PER_WORKER
+        self.api_calls = {"get_table": 0, "avoided": 0, "cached": 0}  # avoided: prefetched tables that needed no get_table
+        self.lock = threading.Lock()
+        self.busy, self.busy_seconds = 0, 0.0  # workers inside process_table, and their summed time there
+
+        self.sink = None
+        self.in_flight = {}  # future -> ((dataset, table), desired descriptions hash)
+        self.total_columns = self.total_tables = self.checked_tables = 0
+        self.resumed_tables = self.unchanged_tables = 0
+        self.first_dispatch = None
+        self.stopped = False  # max_run_seconds ran out before the last table
+        self.pool_seconds = 0.0
+
+    # --- before the first table ---------------------------------------------------------------
+
+    def start(self):
+        cfg, write = self.cfg, self.write
+        if cfg.log_file:
+            write.path = f"column_updates_{self.run_id}{shard_suffix(cfg)}.log"
+            write(f"📝 Logging to {write.path}")
+
+        write(f"🚀 Starting run : {self.run_id}")
+        write(f"📄 Metadata: {cfg.metadata_table}")
+        write(f"📄 Log     : {cfg.job_run_table}")
+        if cfg.shard_count > 1:
+            write(f"🧩 Shard   : {cfg.shard_index + 1} of {cfg.shard_count}")
+        if cfg.engine == "async":
+            write(f"⚡ Engine  : async, up to {cfg.max_in_flight} table(s) in flight")
+
+        self.load_state()
+        self.plan_prefetch()
+
+        # Rules: metadata rows with name patterns, matched against each covered dataset's column inventory.
+        # The inventory holds the current descriptions, so it also serves as that dataset's prefetch.
+        if cfg.metadata_rules:
+            with self.telemetry.phase("metadata_query"):
+                self.rules = self.telemetry.call("metadata_rules", lambda: load_rules(self.client, cfg, write))
+            write(f"📐 Rules   : {len(self.rules)} metadata rule(s)")
+
+    def load_state(self):
+        """Fingerprints of the last run and, when resuming, the checkpoints of the tables already done."""
+        cfg, stats = self.cfg, self.stats
+        if self.incremental:
+            with self.telemetry.phase("fingerprints"):
+                self.fingerprints = load_fingerprints(self.client, cfg)
+        if self.incremental and not cfg.full:
+            stats["unchanged"] = 0
+
+        # Resume: tables the run already finished are skipped, their stats and fingerprints carried over.
+        if not cfg.resume:
+            return
+        self.completed = load_checkpoints(self.client, cfg, self.run_id, self.write)
+        for key, checkpoint in self.completed.items():
+            for k in ("updated", "skipped", "unmatched", "error"):
+                stats[k] += checkpoint.get(k, 0)
+            if self.incremental and checkpoint.get("fingerprint") \
+                    and self.fingerprints.get(key) != checkpoint["fingerprint"]:
+                self.fingerprints[key] = checkpoint["fingerprint"]
+                self.fingerprinted.append(key)
+        self.write(f"↩️ Resuming: {len(self.completed)} table(s) completed earlier "
+                   f"({sum(stats[k] for k in ('updated', 'skipped', 'unmatched', 'error'))} column(s))")
+
+    def plan_prefetch(self):
+        """Datasets with enough touched tables get their descriptions from one INFORMATION_SCHEMA query."""
+        cfg, client, telemetry = self.cfg, self.client, self.telemetry
+        try:
+            counts = telemetry.call("metadata_counts", lambda: dataset_tables(client, cfg))
+            self.to_prefetch = {ds: tables for ds, tables in counts.items() if len(tables) >= cfg.prefetch_min_tables}
+        except Exception as e:
+            self.write(f"⚠️ Could not count metadata tables, using per-table lookups: {e}")
+        if cfg.prefetch_region and self.to_prefetch:
+            try:
+                with telemetry.phase("prefetch"):
+                    self.prefetched = telemetry.call(
+                        "prefetch_region", lambda: prefetch_region(client, cfg, self.to_prefetch))
+                self.prefetch_queries = 1
+            except Exception as e:
+                self.write(f"⚠️ Region prefetch failed, using per-table lookups: {e}")
+            self.to_prefetch = {}
+
+    def add_inventory(self, ds, tables):
+        index = self.prefetched.setdefault(ds, {})
+        for tb, columns in tables.items():
+            index[tb] = {path.lower(): desc for path, desc in columns.items()}
+        self.prefetch_queries += 1
+
+    def prepare_dataset(self, ds):
+        """Per-dataset lookups, done once when the dataset's first table arrives."""
+        cfg, client, cache, telemetry = self.cfg, self.client, self.cache, self.telemetry
+        # Modification times drive incremental skips and validate the dataset's cached schemas.
+        if self.incremental or (cache and ds not in self.to_prefetch and ds not in self.prefetched):
+            try:
+                self.modified[ds] = telemetry.call("modified_times", lambda: fetch_modified_times(client, cfg, ds))
+                if cache:
+                    cache.note_modified(f"{cfg.project_id}.{ds}", self.modified[ds])
+            except Exception as e:
+                self.write(f"⚠️ Could not read modification times for {ds}: {e}")
+        if ds in self.to_prefetch and ds not in self.prefetched:
+            try:
+                with telemetry.phase("prefetch"):
+                    self.prefetched[ds] = telemetry.call(
+                        "prefetch_dataset", lambda: prefetch_dataset(client, cfg, ds, self.to_prefetch[ds]))
+                self.prefetch_queries += 1
+                self.write(f"📚 Prefetched schemas for {len(self.prefetched[ds])} table(s) in {ds}")
+            except Exception as e:
+                self.write(f"⚠️ Schema prefetch failed for {ds}, using per-table lookups: {e}")
+
+    # --- answering the requests of process_table ----------------------------------------------
+
+    def from_cache(self, table_ref, fresh):
+        # Only entries revalidated against this run's modification times are served from the cache.
+        if self.cache and not fresh:
+            bq_table = self.cache.lookup(table_ref, ttl=0)
+            if bq_table is not None:
+                with self.lock:
+                    self.api_calls["cached"] += 1
+                return bq_table
+        with self.lock:
+            self.api_calls["get_table"] += 1
+        return None
+
+    def call(self, op, table_ref, arg):
+        """Answer a process_table request with the bigquery client."""
+        client, cache, telemetry, limiter = self.client, self.cache, self.telemetry, self.limiter
+        if op == "get_table":
+            bq_table = self.from_cache(table_ref, fresh=arg)
+            if bq_table is None:
+                with telemetry.phase("schema_fetch"):
+                    bq_table = telemetry.call("get_table", lambda: client.get_table(table_ref))
+                if cache:
+                    cache.put(bq_table)
+            return bq_table
+        if op == "update_table":
+            updated = limiter.run(table_ref, lambda: telemetry.call(
+                "update_table", lambda: client.update_table(arg, ["schema"])))
+            if cache:
+                cache.put(updated)
+            return updated
+        if op == "log":
+            return self.sink.put(*arg)
+        sql, desc = arg
+        job_cfg = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("desc", "STRING", desc)])
+        with telemetry.phase("ddl"):
+            result = limiter.run(table_ref, lambda: telemetry.call(
+                "ddl", lambda: client.query(sql, job_config=job_cfg).result()))
+        if cache:
+            cache.invalidate(table_ref)
+        return result
+
+    async def call_async(self, op, table_ref, arg):
+        """Answer a process_table request over the REST API.
+
+        Runs on the event loop, which may be api_server's own: the schema cache's SQLite I/O and
+        handing rows to the job log, which waits while the sink's queue is full, go to a thread.
+        """
+        api, cache, telemetry, limiter = self.api, self.cache, self.telemetry, self.limiter
+        if op == "get_table":
+            if cache:
+                bq_table = await asyncio.to_thread(self.from_cache, table_ref, arg)
+            else:
+                bq_table = self.from_cache(table_ref, arg)
+            if bq_table is None:
+                with telemetry.phase("schema_fetch"):
+                    bq_table = await telemetry.call_async("get_table", lambda: api.get_table(table_ref))
+                if cache:
+                    await asyncio.to_thread(cache.put, bq_table)
+            return bq_table
+        if op == "update_table":
+            updated = await limiter.run(table_ref, lambda: telemetry.call_async(
+                "update_table", lambda: api.patch_schema(arg)))
+            if cache:
+                await asyncio.to_thread(cache.put, updated)
+            return updated
+        if op == "log":
+            return await asyncio.to_thread(self.sink.put, *arg)
+        sql, desc = arg
+        params = [bigquery.ScalarQueryParameter("desc", "STRING", desc)]
+        with telemetry.phase("ddl"):
+            result = await limiter.run(table_ref, lambda: telemetry.call_async(
+                "ddl", lambda: api.query(self.cfg.project_id, sql, params)))
+        if cache:
+            await asyncio.to_thread(cache.invalidate, table_ref)
+        return result
+
+    # --- one table ----------------------------------------------------------------------------
+
+    def process_table(self, dataset, table, columns):
+        """Reconcile one table and return (log lines, stats, last-modified ms, applied (column, description)s).
+
+        A generator shared by both engines: it yields ("get_table", table_ref, fresh),
+        ("update_table", table_ref, table), ("ddl", table_ref, (sql, description)) and
+        ("log", table_ref, job-log rows) requests, which drive() / drive_async() answer with
+        `call` / `call_async`.
+        """
+        cfg = self.cfg
+        table_ref = f"{cfg.project_id}.{dataset}.{table}"
+        lines, partial_stats = [], {"updated": 0, "skipped": 0, "unmatched": 0, "error": 0}
+        modified_ms = self.modified.get(dataset, {}).get(table)  # the table's last-modified time after this run, if known
+
+        bq_table = None
+        if dataset in self.prefetched:
+            current = self.prefetched[dataset].get(table)
+            if current is None:
+                with self.lock:
+                    self.api_calls["avoided"] += 1
+                partial_stats["unmatched"] += len(columns)
+                lines.append(f"⚠️ Table not found: {table_ref}")
+                return lines, partial_stats, None, []
+        else:
+            try:
+                bq_table = yield "get_table", table_ref, False
+            except exceptions.NotFound:
+                partial_stats["unmatched"] += len(columns)
+                lines.append(f"⚠️ Table not found: {table_ref}")
+                return lines, partial_stats, None, []
+            except Exception as e:
+                partial_stats["error"] += len(columns)
+                lines.append(f"❌ Error fetching {table_ref}: {e}")
+                return lines, partial_stats, None, []
+            current = describe_schema(bq_table.schema)
+
+        statuses, changed = classify_columns(current, columns)
+        errors = {}
+
+        if changed and cfg.apply_mode == "patch" and bq_table is None:
+            # The prefetched index says something changed; patching still needs the live schema and etag.
+            try:
+                bq_table = yield "get_table", table_ref, False
+                more, changed = classify_columns(describe_schema(bq_table.schema), changed)
+                statuses.update(more)
+            except Exception as e:
+                errors.update({c: f"fetch failed: {e}" for c, _ in changed})
+                changed = []
+        elif bq_table is None:
+            with self.lock:
+                self.api_calls["avoided"] += 1
+
+        if changed and cfg.apply_mode == "patch":
+            changed, modified_ms = yield from self.patch(table_ref, bq_table, changed, statuses, errors, lines, modified_ms)
+        if changed and (yield from self.alter(table_ref, changed, statuses, errors)):
+            modified_ms = None  # DDL does not hand back the new modification time
+
+        applied, rows = [], []
+        for col, desc in columns:
+            col_ref = f"{table_ref}.{col}"
+            status = "error" if col in errors else statuses[col]
+            partial_stats[status] += 1
+            if status == "updated":
+                applied.append((col, desc))
+            if status == "unmatched":
+                lines.append(f"⚠️ Column not found: {col_ref}")
+            elif status == "skipped":
+                lines.append(f"ℹ️ Skipped: {col_ref}")
+            elif status == "updated":
+                lines.append(f"✅ Updated: {col_ref}")
+            else:
+                lines.append(f"❌ Failed {col_ref}: {errors[col]}")
+
+            if status == "skipped" and cfg.log_mode == "changes":
+                continue  # the table's checkpoint row still counts it
+            rows.append({
+                "job_run_id": self.run_id,
+                "timestamp": now_iso(),
+                "status": status,
+                "table_name": table,
+                "column_name": col,
+                "column_metadata": desc,
+                "target_dataset": dataset,
+            })
+        if rows:
+            yield "log", table_ref, rows
+
+        return lines, partial_stats, modified_ms, applied
+
+    def patch(self, table_ref, bq_table, changed, statuses, errors, lines, modified_ms):
+        """Apply `changed` with one etag-guarded schema update; a sub-generator of process_table.
+
+        Re-reads the table and retries when someone else got there first. Returns the columns left
+        for DDL (those of a rejected patch) and the table's modification time, new if it was patched.
+        """
+        for attempt in range(1, self.cfg.patch_attempts + 1):
+            bq_table.schema = apply_descriptions(bq_table.schema, {c.lower(): d for c, d in changed})
+            try:
+                updated = yield "update_table", table_ref, bq_table
+                statuses.update({c: "updated" for c, _ in changed})
+                lines.append(f"🧩 Patched {len(changed)} column(s) in {table_ref}")
+                return [], to_ms(updated.modified)
+            except exceptions.PreconditionFailed:
+                if attempt == self.cfg.patch_attempts:
+                    errors.update({c: f"etag conflict after {attempt} attempts" for c, _ in changed})
+                    return [], modified_ms
+                try:
+                    bq_table = yield "get_table", table_ref, True
+                except Exception as e:
+                    errors.update({c: f"re-fetch failed: {e}" for c, _ in changed})
+                    return [], modified_ms
+                more, changed = classify_columns(describe_schema(bq_table.schema), changed)
+                statuses.update(more)
+                if not changed:
+                    return [], modified_ms
+            except (exceptions.BadRequest, exceptions.Forbidden) as e:
+                if is_rate_limited(e):
+                    errors.update({c: f"rate limited: {e.message}" for c, _ in changed})
+                    return [], modified_ms
+                lines.append(f"↩️ Schema patch rejected for {table_ref}, falling back to DDL: {e.message}")
+                return changed, modified_ms
+            except Exception as e:
+                errors.update({c: str(e) for c, _ in changed})
+                return [], modified_ms
+        return changed, modified_ms
+
+    def alter(self, table_ref, changed, statuses, errors):
+        """Apply `changed` with one ALTER COLUMN each; a sub-generator of process_table.
+
+        Returns whether any column was altered.
+        """
+        altered = False
+        for col, desc in changed:
+            if "." in col:
+                errors[col] = "nested column needs a schema patch; ALTER COLUMN only reaches top-level columns"
+                continue
+            sql = f"ALTER TABLE `{table_ref}` ALTER COLUMN `{col}` SET OPTIONS (description = @desc)"
+            try:
+                yield "ddl", table_ref, (sql, desc)
+                statuses[col] = "updated"
+                altered = True
+            except exceptions.BadRequest as e:
+                errors[col] = f"BadRequest: {e.message}"
+            except Exception as e:
+                errors[col] = str(e)
+        return altered
+
+    @contextlib.contextmanager
+    def timed(self):
+        with self.lock:
+            self.busy += 1
+            self.telemetry.notify("gauge", "workers_busy", self.busy)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.busy -= 1
+                self.busy_seconds += time.perf_counter() - start
+                self.telemetry.notify("gauge", "workers_busy", self.busy)
+
+    def run_table(self, dataset, table, columns):
+        started = time.perf_counter()
+        with self.timed():
+            result = drive(self.process_table(dataset, table, columns), self.call)
+        return result, time.perf_counter() - started
+
+    async def run_table_async(self, dataset, table, columns):
+        started = time.perf_counter()
+        with self.timed():
+            result = await drive_async(self.process_table(dataset, table, columns), self.call_async)
+        return result, time.perf_counter() - started
+
+    # --- dispatching the tables ---------------------------------------------------------------
+
+    def execute(self):
+        """Process every table of the metadata (of this shard) and flush the job log."""
+        cfg = self.cfg
+        ensure_job_log_table(self.client, cfg, self.write)
+        self.sink = JobLogSink(self.client, cfg, self.run_id, self.write, self.telemetry)
+        if cfg.engine == "async":
+            executor, run_table = LoopPool(self.loop, cfg.max_in_flight), self.run_table_async
+        else:
+            executor, run_table = ThreadPoolExecutor(max_workers=cfg.max_workers), self.run_table
+        pool_start = time.perf_counter()
+        try:
+            with span("update_column_descriptions"), executor as pool:
+                try:
+                    self.dispatch(pool, run_table)
+                finally:
+                    if self.own_api:
+                        pool.run(self.api.aclose())
+        except BaseException:
+            self.write(f"\n⏹️ Run interrupted; continue it with --resume {self.run_id}")
+            raise
+        finally:
+            self.pool_seconds = time.perf_counter() - pool_start
+            self.write("\n📥 Flushing job log to BigQuery …")
+            self.write(f"✅ Job log: {self.sink.close()}")
+
+    def dispatch(self, pool, run_table):
+        """Hand the tables to `pool` as their columns are complete and collect them as they finish.
+
+        A bounded number of tables in flight keeps the metadata reader from running ahead of the workers.
+        """
+        cfg, stats, progress, telemetry = self.cfg, self.stats, self.progress, self.telemetry
+        current_ds = None
+        groups = stream_table_groups(self.client, cfg, self.write, telemetry)
+        if self.rules:
+            groups = merge_table_groups(groups, rule_table_groups(
+                self.client, cfg, self.rules, self.write, self.add_inventory, telemetry))
+        for (ds, tb), cols in groups:
+            self.total_columns += len(cols)
+            self.total_tables += 1
+            progress.update(columns=self.total_columns, tables_seen=self.total_tables)
+            if (ds, tb) in self.completed:
+                self.resumed_tables += 1
+                continue
+            if cfg.max_run_seconds and time.time() - self.start_time >= cfg.max_run_seconds:
+                self.stopped = True
+                break
+            if ds != current_ds:
+                self.prepare_dataset(ds)
+                current_ds = ds
+            desired = descriptions_hash(cols) if self.incremental else None
+            last_modified = self.modified.get(ds, {}).get(tb)
+            if self.incremental and not cfg.full and last_modified is not None \
+                    and self.fingerprints.get((ds, tb)) == f"{desired}:{last_modified}":
+                stats["unchanged"] += len(cols)
+                self.unchanged_tables += 1
+                telemetry.notify("count", "columns", len(cols), status="unchanged")
+                continue
+            while len(self.in_flight) >= self.max_queued:
+                done, _ = wait(self.in_flight, return_when=FIRST_COMPLETED)
+                self.collect(done)
+            self.in_flight[pool.submit(run_table, ds, tb, cols)] = ((ds, tb), desired)
+            telemetry.notify("gauge", "queue_depth", max(0, len(self.in_flight) - self.busy))
+            self.checked_tables += 1
+            progress["tables_checked"] = self.checked_tables
+            if self.first_dispatch is None:
+                self.first_dispatch = time.time()
+        self.collect(wait(self.in_flight).done)
+        telemetry.notify("gauge", "queue_depth", 0)
+
+    def collect(self, done):
+        """Count finished tables and queue their checkpoint rows."""
+        for f in done:
+            key, desired = self.in_flight.pop(f)
+            (logs, st, modified_ms, applied), seconds = f.result()
+            for line in logs: self.write(line)
+            for k in self.stats: self.stats[k] += st.get(k, 0)
+            for k, n in st.items():
+                if n:
+                    self.telemetry.notify("count", "columns", n, status=k)
+            self.progress.update(self.stats, tables_done=self.progress.get("tables_done", 0) + 1)
+            fp = None
+            if self.incremental and not st["error"] and modified_ms is not None:
+                fp = f"{desired}:{modified_ms}"
+                if self.fingerprints.get(key) != fp:
+                    self.fingerprints[key] = fp
+                    self.fingerprinted.append(key)
+            # The table's summary row, also its checkpoint. Queued behind the table's column rows, so it
+            # is written no earlier than they are.
+            self.sink.put({
+                "job_run_id": self.run_id,
+                "timestamp": now_iso(),
+                "status": "checkpoint",
+                "table_name": key[1],
+                "column_name": None,
+                "column_metadata": json.dumps({
+                    **st, "duration_sec": round(seconds, 3),
+                    "applied_hash": descriptions_hash(applied) if applied else None,
+                    "fingerprint": fp, **self.shard}),
+                "target_dataset": key[0],
+            })
+
+    # --- after the last table -----------------------------------------------------------------
+
+    def finish(self):
+        """Store the fingerprints, report the run and return its summary."""
+        cfg = self.cfg
+        if self.stopped:
+            self.write(f"⏸️ MAX_RUN_SECONDS reached with tables left; continue with --resume {self.run_id}")
+        if self.incremental and not cfg.full:
+            self.write(f"⏭️ {self.unchanged_tables} of {self.total_tables} table(s) unchanged since last run")
+
+        if self.incremental:
+            try:
+                with self.telemetry.phase("fingerprints"):
+                    save_fingerprints(self.client, cfg, self.run_id, self.fingerprints, self.fingerprinted)
+            except Exception as e:
+                self.write(f"⚠️ Failed writing fingerprints: {e}")
+
+        duration = time.time() - self.start_time
+        utilisation = self.busy_seconds / (self.slots * self.pool_seconds) if self.pool_seconds else 0.0
+        self.telemetry.notify("gauge", "utilisation", utilisation)
+        timings = self.telemetry.breakdown()
+        timings["worker_utilisation"] = round(utilisation, 3)
+        self.report(duration, utilisation, timings)
+        self.log_run_timing(duration, timings)
+
+        return {
+            "run_id": self.run_id,
+            "stats": self.stats,
+            "total_columns": self.total_columns,
+            "tables_checked": self.checked_tables,
+            "tables_total": self.total_tables,
+            "tables_resumed": self.resumed_tables,
+            "complete": not self.stopped,
+            "shard_index": cfg.shard_index,
+            "shard_count": cfg.shard_count,
+            "cache_hits": self.api_calls["cached"],
+            "cache_misses": self.api_calls["get_table"] if self.cache else None,
+            "duration_sec": round(duration, 2),
+            "timings": timings,
+        }
+
+    def report(self, duration, utilisation, timings):
+        cfg, write, api_calls, limiter = self.cfg, self.write, self.api_calls, self.limiter
+        write("\n🏁 Run complete:")
+        for k, v in self.stats.items():
+            write(f"  {k.capitalize():9}: {v}")
+        write(f"  Total columns : {self.total_columns}")
+        write(f"  Tables        : {self.checked_tables} checked of {self.total_tables} ({api_calls['get_table']} get_table calls)"
+              + (f", {self.resumed_tables} completed before resuming" if cfg.resume else ""))
+        if self.prefetch_queries:
+            queries = self.prefetch_queries
+            saved = api_calls["avoided"] - queries
+            write(f"  Prefetch      : {len(self.prefetched)} dataset(s) via {queries} quer{'y' if queries == 1 else 'ies'}, "
+                  f"{saved} API call(s) saved")
+        if self.cache:
+            write(f"  Schema cache  : {api_calls['cached']} hit(s), {api_calls['get_table']} miss(es)")
+        write(f"  Rate limiter  : {limiter.summary()}")
+        if limiter.first_op:
+            write(f"  First update  : {limiter.first_op - self.start_time:.2f} sec after start "
+                  f"(first table dispatched after {self.first_dispatch - self.start_time:.2f} sec)")
+        write(f"  Workers       : {utilisation:.0%} utilised ({self.busy_seconds:.2f} worker-sec over {self.pool_seconds:.2f} sec)")
+        write("  Phases        : " + ", ".join(f"{k} {v:.2f}s" for k, v in timings["phases"].items()))
+        for op, c in timings["calls"].items():
+            write(f"    {op:22} {c['count']:>6} call(s), {c['errors']} error(s), p50 {c['p50_ms']} ms, p99 {c['p99_ms']} ms")
+        write(f"  Run ID        : {self.run_id}" + (f" (shard {cfg.shard_index + 1} of {cfg.shard_count})" if self.shard else ""))
+        write(f"  Duration      : {duration:.2f} sec ({duration/60:.2f} min)")
+
+    def log_run_timing(self, duration, timings):
+        """One summary row per run (per shard of a sharded run): stats, table counts and the timing
+        breakdown go in column_metadata as JSON."""
+        cfg = self.cfg
+        try:
+            errors = self.client.insert_rows_json(cfg.job_run_table, [{
+                "job_run_id": self.run_id,
+                "timestamp": now_iso(),
+                "status": "run_timing",
+                "table_name": None,
+                "column_name": None,
+                "column_metadata": json.dumps({
+                    **timings, "duration_sec": round(duration, 2), "stats": self.stats, "complete": not self.stopped,
+                    "tables": {"total": self.total_tables, "checked": self.checked_tables,
+                               "unchanged": self.unchanged_tables, "resumed": self.resumed_tables},
+                    "log_mode": cfg.log_mode, **self.shard}),
+                "target_dataset": None,
+            }])
+            if errors:
+                self.write(f"⚠️ Run timing row rejected: {errors[0].get('errors')}")
+        except Exception as e:
+            self.write(f"⚠️ Failed writing run timings: {e}")
+
+def update_column_descriptions(cfg, client=None, run_id=None, log=None, progress=None, cache=None,
+                               telemetry=None, api=None, loop=None):
+    """Reconcile column descriptions with the metadata table and return the run's summary.
+
+    `client` and `cache` (a SchemaCache) let callers reuse a bigquery.Client and the schema cache
+    across runs, `log` is the RunLog receiving the output and `progress`, if given, is a dict kept
+    up to date with the counters while the run goes. `telemetry` collects the phase timings and
+    call latencies reported at the end of the run.
+
+    With `cfg.engine == "async"` tables are processed as coroutines instead of on a thread pool:
+    up to `cfg.max_in_flight` at once on `loop` (a private loop when not given), with schema reads
+    and writes going through `api` (an AsyncBigQuery). The metadata query, per-dataset lookups and
+    the job log keep using `client`.
+    """
+    run = UpdateRun(
+        cfg,
+        client=client or make_client(cfg),
+        run_id=run_id or cfg.resume or f"job_{now_iso().replace(':', '-')}",
+        write=log or RunLog(),
+        progress={} if progress is None else progress,
+        cache=cache or SchemaCache.from_env(),
+        telemetry=telemetry or Telemetry(),
+        api=api,
+        loop=loop,
+    )
+    run.start()
+    run.execute()
+    return run.finish()
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Update BigQuery column descriptions from the metadata table.")
+    parser.add_argument("--log", action="store_true", help="write local log")
+    parser.add_argument("--full", action="store_true", help="ignore stored fingerprints and re-check every table")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue an interrupted run, skipping its completed tables")
+    parser.add_argument("--run-id", help="run ID to use, shared by the shards of a sharded run")
+    parser.add_argument("--check", action="store_true", help="validate and print the configuration, then exit")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    cfg = Config.from_env(full=args.full, log_file=args.log, resume=args.resume)
+    try:
+        cfg.validate()
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    if args.check:
+        for name, value in vars(cfg).items():
+            print(f"{name:20} {value}")
+        return
+
+    try:
+        # The tasks of one Cloud Run job execution are the shards of one run
+        update_column_descriptions(cfg, run_id=args.run_id or os.getenv("CLOUD_RUN_EXECUTION"))
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted.")
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
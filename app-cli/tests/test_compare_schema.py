@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+from google.cloud import bigquery
+
+from lake import compare_schema
+
+
+def partitioned_table(table_id):
+    table = bigquery.Table(table_id, schema=[bigquery.SchemaField("id", "INTEGER"),
+                                             bigquery.SchemaField("day", "DATE"),
+                                             bigquery.SchemaField("value", "STRING")])
+    table.time_partitioning = bigquery.TimePartitioning(field="day")
+    return table
+
+
+class Client:
+    """Answers the comparison's queries for two tables whose partitions have the same row counts.
+
+    `modified` holds each table's {partition_id: last_modified_time}; record comparisons find one
+    row whose values differ. Table B repeats a key when `duplicate_key` is set.
+    """
+
+    def __init__(self, modified, duplicate_key=False):
+        self.modified, self.duplicate_key, self.queries = modified, duplicate_key, []
+
+    def query(self, sql, job_config=None, **kwargs):
+        self.queries.append(sql)
+        params = {p.name: getattr(p, "value", None) for p in job_config.query_parameters} if job_config else {}
+        if "INFORMATION_SCHEMA.PARTITIONS" in sql:
+            rows = [{"partition_id": pid, "total_rows": 10, "last_modified_time": modified}
+                    for pid, modified in self.modified[params["table_name"]].items()]
+        elif "GROUP BY side, bucket" in sql:
+            counted = "COUNT(DISTINCT key_fp)" in sql
+            rows = [{"side": "a", "bucket": 0, "row_count": 10, "row_xor": 1, "key_count": 10 if counted else None},
+                    {"side": "b", "bucket": 0, "row_count": 10, "row_xor": 2,
+                     "key_count": (9 if self.duplicate_key else 10) if counted else None}]
+        else:
+            rows = [{"type": "mismatched", "row_count": 1, "samples": ['{"id":1}']}]
+        return SimpleNamespace(result=lambda **kwargs: rows)
+
+
+def compare(client, join_keys=("id",)):
+    tables = {"p.d.a": partitioned_table("p.d.a"), "p.d.b": partitioned_table("p.d.b")}
+    counts = {"p.d.a": 20, "p.d.b": 20}
+    return compare_schema.compare_pair(client, "p.d.a", "p.d.b", tables, counts, data="records",
+                                       join_keys=list(join_keys) or None)
+
+
+def test_equal_row_counts_with_different_values_differ():
+    client = Client({"a": {"20250601": 1, "20250602": 1}, "b": {"20250601": 1, "20250602": 2}})
+    result = compare(client)
+    assert result["status"] == "differ"
+    assert result["partitions_differing"] == []
+    assert result["partitions_modified"] == ["20250602"]
+    assert result["data"]["mismatched"]["rows"] == 1
+    # Only the partition modified at different times is read
+    assert all("'2025-06-02'" in sql and "'2025-06-01'" not in sql for sql in client.queries if "FARM_FINGERPRINT" in sql)
+
+
+def test_unmodified_partitions_are_not_read():
+    client = Client({"a": {"20250601": 1}, "b": {"20250601": 1}})
+    result = compare(client)
+    assert result["status"] == "match"
+    assert "data" not in result
+    assert not any("FARM_FINGERPRINT" in sql for sql in client.queries)
+
+
+def test_mismatches_are_counted_per_key():
+    client = Client({"a": {"20250601": 1}, "b": {"20250601": 2}})
+    compare(client)
+    join = next(sql for sql in client.queries if "FULL OUTER JOIN" in sql)
+    assert join.count("GROUP BY key_fp") == 2
+    assert "a.row_count != b.row_count OR a.row_xor != b.row_xor" in join
+
+
+def test_detected_key_must_be_unique():
+    client = Client({"a": {"20250601": 1}, "b": {"20250601": 2}})
+    assert compare(client, join_keys=())["status"] == "differ"
+    client = Client({"a": {"20250601": 1}, "b": {"20250601": 2}}, duplicate_key=True)
+    result = compare(client, join_keys=())
+    assert result["status"] == "error"
+    assert "--key" in result["error"]["data"]
+    assert not any("FULL OUTER JOIN" in sql for sql in client.queries)
+
+
+def profile(minimum, maximum):
+    return {"rows": 100, "columns": {"amount": {"nulls": 0, "distinct": 50, "min": minimum, "max": maximum,
+                                                "hll": None}}}
+
+
+def test_sampled_profiles_only_flag_disjoint_ranges():
+    assert compare_schema.compare_profiles(profile(1, 90), profile(3, 95), {}) == [
+        ("amount", "min", 1, 3), ("amount", "max", 90, 95)]
+    assert compare_schema.compare_profiles(profile(1, 90), profile(3, 95), {}, sampled=True) == []
+    assert compare_schema.compare_profiles(profile(1, 90), profile(100, 200), {}, sampled=True) == [
+        ("amount", "range", "1 to 90", "100 to 200")]
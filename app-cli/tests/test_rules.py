@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+from google.api_core import exceptions
+
+from lake.updater import Config, RuleSet, merge_table_groups, rule_table_groups
+
+
+def describe(rows, dataset, table, column):
+    match = RuleSet(rows).matcher(dataset, table)
+    return None if match is None else match(column)
+
+
+@pytest.mark.parametrize("rows, expected", [
+    # an exact column name beats a column pattern, whatever their table and dataset parts
+    ([("sales", "orders", "amount*", "pattern"), ("*", "*", "amount", "exact")], "exact"),
+    # then an exact table name beats a table pattern
+    ([("sales", "*", "amount", "any table"), ("*", "orders", "amount", "orders")], "orders"),
+    # then an exact dataset name beats a dataset pattern
+    ([("re:sal.*", "orders", "amount", "pattern"), ("sales", "orders", "amount", "sales")], "sales"),
+    # then the pattern with more literal characters
+    ([("*", "*", "a*", "short"), ("*", "*", "amo*", "long")], "long"),
+])
+def test_specific_rules_beat_wildcards(rows, expected):
+    assert describe(rows, "sales", "orders", "amount") == expected
+    assert describe(rows[::-1], "sales", "orders", "amount") == expected
+
+
+def test_remaining_ties_go_to_the_first_rule():
+    rows = [("*", "*", "amo*", "first"), ("*", "*", "*unt", "second")]
+    assert describe(rows, "sales", "orders", "amount") == "first"
+    assert describe(rows[::-1], "sales", "orders", "amount") == "second"
+
+
+def test_rule_matching():
+    rows = [("*", "*", "id", "identifier"), ("sales", "order?", "rec.*", "nested"), ("re:\\d+", "*", "x", "digits")]
+    assert describe(rows, "sales", "orders", "ID") == "identifier"
+    assert describe(rows, "sales", "orders", "rec.key.value") == "nested"
+    assert describe(rows, "sales", "orders_2024", "rec.key") is None
+    assert describe(rows, "2024", "t", "x") == "digits"
+    assert describe(rows, "a2024", "t", "x") is None
+
+
+def test_explicit_rows_beat_rules():
+    explicit = [(("sales", "orders"), [("amount", "explicit")])]
+    derived = [(("sales", "customers"), [("id", "rule")]), (("sales", "orders"), [("AMOUNT", "rule"), ("id", "rule")])]
+    assert list(merge_table_groups(explicit, derived)) == [
+        (("sales", "customers"), [("id", "rule")]),
+        (("sales", "orders"), [("amount", "explicit"), ("id", "rule")]),
+    ]
+
+
+class Client:
+    """Answers COLUMN_FIELD_PATHS queries for the datasets in `columns`; others are not found."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def query(self, sql, job_config=None):
+        for dataset, rows in self.columns.items():
+            if f".{dataset}`.INFORMATION_SCHEMA" in sql:
+                return SimpleNamespace(result=lambda **kwargs: [SimpleNamespace(**row) for row in rows])
+        raise exceptions.NotFound("Not found: Dataset")
+
+
+def test_missing_dataset_is_skipped():
+    client = Client({"sales": [{"table_name": "orders", "field_path": "id", "description": None}]})
+    cfg = Config(project_id="p", metadata_table="m", job_run_table="j")
+    rules = RuleSet([("gone", "*", "id", "gone"), ("sales", "*", "id", "identifier")])
+    lines = []
+    assert list(rule_table_groups(client, cfg, rules, lines.append)) == [(("sales", "orders"), [("id", "identifier")])]
+    assert any("gone" in line and "skipped" in line for line in lines)
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions
+
+from fake_bigquery import Lake, Recorder, FakeClient
+from lake import updater
+
+TABLE = "bench-lake.dataset_0.table_0"
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SCHEMA_CACHE_PATH", "off")
+
+
+@pytest.fixture
+def lake():
+    """One table with two top-level and two nested columns, all of whose descriptions change."""
+    return Lake(datasets=1, tables=1, columns=2, nested=1, changed=1.0, unmatched=0.0)
+
+
+def run(lake, client, **overrides):
+    cfg = updater.Config(project_id=lake.project, metadata_table=lake.metadata_table,
+                         job_run_table=lake.job_run_table, sleep_ms=0, max_ops_per_sec=1000, **overrides)
+    log = updater.RunLog(echo=False)
+    return updater.update_column_descriptions(cfg, client=client, log=log), list(log.tail)
+
+
+def descriptions(lake):
+    fields = lake.tables[TABLE]["schema"]["fields"]
+    return {f["name"]: f.get("description") for f in fields} | {
+        f"{f['name']}.{c['name']}": c.get("description") for f in fields for c in f.get("fields", [])}
+
+
+def client_with(lake, update_table):
+    """A fake client whose update_table is wrapped by `update_table(original, table, fields)`."""
+    client = FakeClient(lake=lake, recorder=Recorder(), time_scale=0)
+    original = client.update_table
+    client.update_table = lambda table, fields, **kwargs: update_table(original, table, fields, **kwargs)
+    return client
+
+
+def concurrent_writes(lake, times):
+    """update_table that lets someone else change the table first, `times` times."""
+    remaining = [times]
+
+    def update_table(original, table, fields, **kwargs):
+        if remaining[0]:
+            remaining[0] -= 1
+            resource = lake.tables[TABLE]
+            resource["etag"] = str(int(resource["etag"]) + 1)
+        return original(table, fields, **kwargs)
+    return update_table
+
+
+def test_etag_conflict_is_retried_on_a_fresh_schema(lake):
+    client = client_with(lake, concurrent_writes(lake, 1))
+    result, _ = run(lake, client)
+    assert result["stats"] == {"updated": 4, "skipped": 0, "unmatched": 0, "error": 0}
+    assert client.recorder.summary()["update_table"]["count"] == 2
+    assert all(d.endswith("(revised)") for name, d in descriptions(lake).items() if name != "rec_0")
+
+
+def test_etag_conflicts_give_up_after_patch_attempts(lake):
+    client = client_with(lake, concurrent_writes(lake, 10))
+    result, lines = run(lake, client, patch_attempts=2)
+    assert result["stats"]["error"] == 4
+    assert client.recorder.summary()["update_table"]["count"] == 2
+    assert any("etag conflict after 2 attempts" in line for line in lines)
+
+
+def test_rejected_patch_falls_back_to_ddl_for_top_level_columns(lake):
+    def reject(original, table, fields, **kwargs):
+        raise exceptions.BadRequest("Invalid schema update")
+
+    result, lines = run(lake, client_with(lake, reject))
+    assert result["stats"] == {"updated": 2, "skipped": 0, "unmatched": 0, "error": 2}
+    current = descriptions(lake)
+    assert current["col_0"].endswith("(revised)") and current["col_1"].endswith("(revised)")
+    assert current["rec_0.key"] == "key" and current["rec_0.value"] == "value"
+    assert sum("needs a schema patch" in line for line in lines) == 2
+
+
+def test_ddl_mode_reports_nested_columns(lake):
+    result, lines = run(lake, FakeClient(lake=lake, recorder=Recorder(), time_scale=0), apply_mode="ddl")
+    assert result["stats"] == {"updated": 2, "skipped": 0, "unmatched": 0, "error": 2}
+    assert [line for line in lines if "needs a schema patch" in line] == [
+        f"❌ Failed {TABLE}.rec_0.key: nested column needs a schema patch; ALTER COLUMN only reaches top-level columns",
+        f"❌ Failed {TABLE}.rec_0.value: nested column needs a schema patch; ALTER COLUMN only reaches top-level columns",
+    ]
+
+
+def test_fake_rejects_nested_alter_column(lake):
+    client = FakeClient(lake=lake, recorder=Recorder(), time_scale=0)
+    with pytest.raises(exceptions.BadRequest):
+        client.query(f"ALTER TABLE `{TABLE}` ALTER COLUMN `rec_0.key` SET OPTIONS (description = 'x')").result()
+
+
+def test_resume_retries_tables_with_errors(tmp_path):
+    lake = Lake(datasets=1, tables=2, columns=2, nested=1, changed=1.0, unmatched=0.0)
+    client = client_with(lake, concurrent_writes(lake, 10))
+    first, _ = run(lake, client, patch_attempts=1, checkpoint_dir=str(tmp_path))
+    assert first["stats"] == {"updated": 4, "skipped": 0, "unmatched": 0, "error": 4}
+
+    client = FakeClient(lake=lake, recorder=Recorder(), time_scale=0)
+    resumed, lines = run(lake, client, checkpoint_dir=str(tmp_path), resume=first["run_id"])
+    assert resumed["tables_resumed"] == 1
+    assert resumed["stats"] == {"updated": 8, "skipped": 0, "unmatched": 0, "error": 0}
+    assert "↩️ Retrying 1 table(s) that had errors" in lines
+    assert all(d.endswith("(revised)") for name, d in descriptions(lake).items() if name != "rec_0")
+
+
+def test_async_api_is_closed_when_the_run_fails(lake, monkeypatch):
+    closed = []
+
+    class Api:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def aclose(self):
+            closed.append(True)
+
+    def broken_metadata(*args):
+        raise RuntimeError("metadata query failed")
+
+    monkeypatch.setattr(updater, "AsyncBigQuery", Api)
+    monkeypatch.setattr(updater, "stream_table_groups", broken_metadata)
+    with pytest.raises(RuntimeError):
+        run(lake, FakeClient(lake=lake, recorder=Recorder(), time_scale=0), engine="async")
+    assert closed == [True]
+
+
+def test_async_rate_limiter_made_off_the_loop():
+    limiter = updater.AsyncRateLimiter(1000, 2, 0, updater.Telemetry())
+
+    async def op():
+        return "done"
+
+    assert asyncio.run(limiter.run("t", op)) == "done"
@@ -18,7 +18,9 @@ CREATE TABLE IF NOT EXISTS `@PROJECT_ID.governance_metadata.job_runs` (
     column_name STRING,
     column_metadata STRING,
     target_dataset STRING
-);
+)
+PARTITION BY DATE(timestamp)
+CLUSTER BY target_dataset, table_name;
 
 -- Create sample tables to update
 CREATE DATASET IF NOT EXISTS `@PROJECT_ID.raw_data`;
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the BigQuery REST API, serving a fake_bigquery Lake over HTTP.
+
+Answers tables.get, tables.patch, tabledata.insertAll, jobs.insert, jobs.get and
+jobs.getQueryResults with the latencies, quotas and failure rates of a FakeClient, so both the
+bigquery client (through `client_options.api_endpoint`) and the updater's async engine can run
+against it. On its own it serves a generated lake:
+
+    python benchmarks/rest_server.py --port 9050
+    BIGQUERY_API_ENDPOINT=http://localhost:9050 ENGINE=async python app-cli/update-column-metadata/main.py
+"""
+
+import copy, time, asyncio, argparse, threading
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from google.api_core.exceptions import GoogleAPICallError, BadRequest, Forbidden, PreconditionFailed
+
+from fake_bigquery import Lake, Recorder, FakeClient
+
+REST_TYPES = {bool: "BOOLEAN", int: "INTEGER", float: "FLOAT", str: "STRING"}
+JOB_LOCATION = "US"
+
+def error_body(e):
+    reason = (e.errors or [{}])[0].get("reason") or type(e).__name__
+    return {"code": e.code, "message": e.message, "errors": [{"reason": reason, "message": e.message}]}
+
+def query_results(rows):
+    """Schema and f/v rows of a getQueryResults response."""
+    if not rows:
+        return {"fields": []}, []
+    names = list(rows[0].keys())
+    fields = []
+    for name in names:
+        sample = next((r[name] for r in rows if r[name] is not None), "")
+        fields.append({"name": name, "type": REST_TYPES.get(type(sample), "STRING"), "mode": "NULLABLE"})
+    values = [{"f": [{"v": None if r[n] is None else str(r[n])} for n in names]} for r in rows]
+    return {"fields": fields}, values
+
+def create_app(fake):
+    """FastAPI app answering REST calls from the lake, quotas, latencies and recorder of `fake`."""
+    app = FastAPI()
+    jobs = {}  # job id -> {"resource", "rows", "done_at"}
+
+    async def call(op, fn, table_update=None):
+        """Simulate one API call: latency, quota and failure rate, then `fn()`; errors become responses."""
+        start, outcome = time.monotonic(), "ok"
+        try:
+            await asyncio.sleep(fake.latency[op].sample(fake.rng))
+            fake._check_quota(table_update)
+            if fake.fail_rate and fake.rng.random() < fake.fail_rate:
+                raise Forbidden("Exceeded rate limits: simulated", errors=[{"reason": "rateLimitExceeded"}])
+            return JSONResponse(fn())
+        except GoogleAPICallError as e:
+            outcome = type(e).__name__
+            return JSONResponse({"error": error_body(e)}, status_code=e.code)
+        finally:
+            fake.recorder.record(op, time.monotonic() - start, outcome)
+
+    @app.get("/bigquery/v2/projects/{project}/datasets/{dataset}/tables/{table}")
+    async def get_table(project: str, dataset: str, table: str):
+        table_id = f"{project}.{dataset}.{table}"
+
+        def fetch():
+            with fake.lake.lock:
+                return copy.deepcopy(fake._resource(table_id))
+        return await call("get_table", fetch)
+
+    @app.patch("/bigquery/v2/projects/{project}/datasets/{dataset}/tables/{table}")
+    async def patch_table(project: str, dataset: str, table: str, request: Request):
+        table_id = f"{project}.{dataset}.{table}"
+        body, etag = await request.json(), request.headers.get("if-match")
+
+        def patch():
+            with fake.lake.lock:
+                resource = fake._resource(table_id)
+                if etag and etag != resource["etag"]:
+                    raise PreconditionFailed(f"Precondition check failed for {table_id}")
+                if "schema" in body:
+                    resource["schema"] = body["schema"]
+                resource["etag"] = str(int(resource["etag"]) + 1)
+                resource["lastModifiedTime"] = str(int(time.time() * 1000))
+                return copy.deepcopy(resource)
+        return await call("update_table", patch, table_update=table_id)
+
+    @app.post("/bigquery/v2/projects/{project}/datasets/{dataset}/tables/{table}/insertAll")
+    async def insert_all(project: str, dataset: str, table: str):
+        return await call("insert_rows_json", lambda: {"kind": "bigquery#tableDataInsertAllResponse"})
+
+    @app.post("/bigquery/v2/projects/{project}/jobs")
+    async def insert_job(project: str, request: Request):
+        body = await request.json()
+        query = body["configuration"]["query"]
+        params = {p["name"]: p["parameterValue"].get("value") for p in query.get("queryParameters", [])}
+        job_id = body["jobReference"]["jobId"]
+
+        def run():
+            resource = {
+                "kind": "bigquery#job",
+                "id": f"{project}:{JOB_LOCATION}.{job_id}",
+                "jobReference": {"projectId": project, "jobId": job_id, "location": JOB_LOCATION},
+                "configuration": body["configuration"],
+                "status": {"state": "RUNNING"},
+            }
+            try:
+                try:
+                    rows = fake._answer(query["query"], params)
+                except NotImplementedError as e:  # a failed job, as BigQuery reports SQL it rejects
+                    raise BadRequest(str(e), errors=[{"reason": "invalidQuery"}])
+            except GoogleAPICallError as e:
+                rows = []
+                resource["status"].update(errorResult=error_body(e)["errors"][0], errors=error_body(e)["errors"])
+            # The job finishes after a query's latency; jobs.get and getQueryResults poll for it.
+            jobs[job_id] = {"resource": resource, "rows": [dict(r.items()) for r in rows],
+                            "done_at": time.monotonic() + fake.latency["query"].sample(fake.rng)}
+            return resource
+        return await call("insert_job", run)
+
+    def job_state(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+        if time.monotonic() >= job["done_at"]:
+            job["resource"]["status"]["state"] = "DONE"
+        return job
+
+    @app.get("/bigquery/v2/projects/{project}/jobs/{job_id}")
+    async def get_job(project: str, job_id: str):
+        job = job_state(job_id)
+        if job is None:
+            return JSONResponse({"error": {"code": 404, "message": f"Not found: Job {job_id}"}}, status_code=404)
+        return await call("get_job", lambda: job["resource"])
+
+    @app.get("/bigquery/v2/projects/{project}/queries/{job_id}")
+    async def get_query_results(project: str, job_id: str, timeoutMs: int = 10000, maxResults: int = None,
+                                pageToken: str = None):
+        job = jobs.get(job_id)
+        if job is None:
+            return JSONResponse({"error": {"code": 404, "message": f"Not found: Job {job_id}"}}, status_code=404)
+        await asyncio.sleep(max(0.0, min(job["done_at"] - time.monotonic(), timeoutMs / 1000)))
+        job = job_state(job_id)
+
+        def results():
+            done = job["resource"]["status"]["state"] == "DONE"
+            schema, rows = query_results(job["rows"])
+            offset = int(pageToken or 0)
+            end = len(rows) if maxResults is None else offset + maxResults
+            page = {"kind": "bigquery#getQueryResultsResponse", "jobReference": job["resource"]["jobReference"],
+                    "jobComplete": done}
+            if done:
+                page.update(schema=schema, rows=rows[offset:end], totalRows=str(len(rows)))
+                if end < len(rows):
+                    page["pageToken"] = str(end)
+            return page
+        return await call("get_job", results)
+
+    return app
+
+def serve(app, host="127.0.0.1", port=0):
+    """Run `app` with uvicorn on a background thread; returns the server and its base URL."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="rest-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{port}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a generated lake through a stand-in BigQuery REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9050)
+    parser.add_argument("--datasets", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=20, help="tables per dataset")
+    parser.add_argument("--columns", type=int, default=30, help="top-level columns per table")
+    parser.add_argument("--changed", type=float, default=0.3, help="share of descriptions that need an update")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier for all simulated latencies")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of calls failing with rateLimitExceeded")
+    parser.add_argument("--api-qps", type=int, help="global API calls per second before 429s")
+    args = parser.parse_args(argv)
+
+    lake = Lake(datasets=args.datasets, tables=args.tables, columns=args.columns, changed=args.changed, seed=args.seed)
+    fake = FakeClient(lake.project, lake=lake, recorder=Recorder(), time_scale=args.time_scale,
+                      fail_rate=args.fail_rate, api_qps=args.api_qps, seed=args.seed)
+    print(f"PROJECT_ID={lake.project}")
+    print(f"METADATA_TABLE={lake.metadata_table}")
+    print(f"JOB_RUN_TABLE={lake.job_run_table}")
+    print(f"BIGQUERY_API_ENDPOINT=http://{args.host}:{args.port}")
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
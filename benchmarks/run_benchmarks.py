@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the lake management tools against a simulated BigQuery backend.
+
+Each scenario runs in a fresh process on a generated lake and reports throughput, per-operation
+call counts and p50/p99 latency, and peak RSS. Results are written as JSON so runs of different
+versions can be compared with --baseline.
+"""
+
+import os, sys, json, time, argparse, platform, resource, builtins, tempfile, contextlib, subprocess
+import multiprocessing
+from functools import partial
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from google.cloud import bigquery
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(ROOT, "app-cli"))
+from fake_bigquery import Lake, Recorder, FakeClient
+import rest_server
+import lake as tools
+
+# name -> (tool, options); options of the updater scenarios are Config fields
+SCENARIOS = {
+    "updater":              ("updater", {}),
+    "updater-ddl":          ("updater", {"apply_mode": "ddl"}),
+    "updater-prefetch":     ("updater", {"prefetch_min_tables": 1}),
+    "updater-load-log":     ("updater", {"log_sink_mode": "load"}),
+    "updater-rerun-cached": ("updater", {"warmup": True, "cache": True}),
+    "updater-async":        ("updater", {"engine": "async"}),
+    "updater-4-shards":     ("updater", {"shard_count": 4}),
+    "updater-rules":        ("updater", {"metadata_rules": True}),
+    "compare-tables":       ("compare_tables", {}),
+    "compare-tables-region": ("compare_tables", {"region": "us"}),
+    "compare-tables-drift": ("compare_tables", {"region": "us", "drift": True}),
+    "compare-tables-sync":  ("compare_tables", {"region": "us", "sync": "copy", "drop": 0.3, "poll": 0.1}),
+    "compare-table-schema": ("compare_schema", {"pairs": 20}),
+    "compare-table-schema-batch": ("compare_schema_batch", {}),
+}
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+def run_updater(lake, client_factory, options):
+    """Run the updater; with `shard_count` its shards run side by side, as separate instances would."""
+    updater = tools.load("updater")
+    if options.get("metadata_rules"):
+        lake.with_rules()
+    shards = options.get("shard_count", 1)
+    clients = [client_factory(lake.project) for _ in range(shards)]
+    client = clients[0]
+    server = endpoint = None
+    if options.get("engine") == "async":
+        # Table reads and writes go over HTTP to a stand-in REST API sharing the client's lake and quotas
+        server, endpoint = rest_server.serve(rest_server.create_app(client))
+    cfg = updater.Config.from_env(
+        project_id=lake.project, metadata_table=lake.metadata_table, job_run_table=lake.job_run_table,
+        api_endpoint=endpoint, **{k: v for k, v in options.items() if k in updater.Config.__dataclass_fields__})
+    def run():
+        run_shard = partial(updater.update_column_descriptions, log=updater.RunLog(echo=False),
+                            run_id=f"bench_{time.time_ns()}")  # shards of a run share its ID
+        with ThreadPoolExecutor(max_workers=shards) as pool:
+            results = pool.map(lambda i: run_shard(replace(cfg, shard_index=i), client=clients[i]), range(shards))
+            return sum(r["total_columns"] for r in results)
+    try:
+        if options.get("warmup"):
+            run()
+            client.recorder.reset()
+        start = time.monotonic()
+        columns = run()
+    finally:
+        if server:
+            server.should_exit = True
+    return time.monotonic() - start, columns, "columns"
+
+def run_compare_tables(lake, client_factory, options):
+    compare = tools.load("compare_tables")
+    lake.drifted("bench-prod", drop=options.get("drop", 0.05))
+    environments = [("preprod", lake.project), ("prod", "bench-prod")]
+    start = time.monotonic()
+    with mock.patch.object(bigquery, "Client", client_factory):
+        if options.get("sync"):
+            missing = [t for t in lake.tables if t.startswith(f"{lake.project}.")
+                       and t.replace(f"{lake.project}.", "bench-prod.", 1) not in lake.tables]
+            compare.sync(environments, "preprod", "prod", options["sync"], options.get("region"),
+                         options.get("workers", 16), options.get("max_jobs", 16), poll=options.get("poll"))
+            return time.monotonic() - start, len(missing), "tables synced"
+        if options.get("drift"):
+            compare.schema_drift(environments, options.get("region"), options.get("workers", 16))
+        else:
+            compare.main(environments, options.get("region"), options.get("workers", 16))
+    return time.monotonic() - start, len(lake.tables), "tables"
+
+def run_compare_schema(lake, client_factory, options):
+    compare = tools.load("compare_schema")
+    lake.drifted("bench-prod")
+    pairs = [t for t in sorted(lake.tables) if t.startswith(f"{lake.project}.")][:options.get("pairs", 20)]
+    start = time.monotonic()
+    with mock.patch.object(bigquery, "Client", client_factory), \
+            mock.patch.object(builtins, "input", lambda prompt="": "n"):
+        for table_id in pairs:
+            other = table_id.replace(f"{lake.project}.", "bench-prod.", 1)
+            if other in lake.tables:
+                compare.main(table_id, other, lake.project)
+    return time.monotonic() - start, len(pairs), "table pairs"
+
+def run_compare_schema_batch(lake, client_factory, options):
+    compare = tools.load("compare_schema")
+    lake.drifted("bench-prod")
+    datasets = [(f"{lake.project}.{d}", f"bench-prod.{d}") for d in lake.datasets(lake.project)]
+    start = time.monotonic()
+    with mock.patch.object(bigquery, "Client", client_factory), contextlib.redirect_stderr(sys.stdout):
+        pairs, unlisted = compare.dataset_pairs(client_factory(lake.project), datasets, options.get("workers", 16))
+        compare.batch(pairs, lake.project, options.get("data"), workers=options.get("workers", 16),
+                      output=os.devnull, unlisted=unlisted)
+    return time.monotonic() - start, len(pairs), "table pairs"
+
+RUNNERS = {"updater": run_updater, "compare_tables": run_compare_tables, "compare_schema": run_compare_schema,
+           "compare_schema_batch": run_compare_schema_batch}
+
+def run_scenario(name, lake_args, client_args, overrides):
+    """Run one scenario in this (fresh) process and return its result record."""
+    tool, options = SCENARIOS[name]
+    options = {**options, **overrides}
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    os.chdir(workdir)  # the tools write their reports and spill files to the working directory
+    os.environ["SCHEMA_CACHE_PATH"] = os.path.join(workdir, "schema_cache.sqlite") if options.get("cache") else "off"
+    os.environ["LOG_SPILL_DIR"] = workdir
+
+    lake = Lake(**lake_args)
+    recorder = Recorder()
+    shared = None
+
+    def client_factory(project=None, **kwargs):
+        nonlocal shared
+        client = FakeClient(project, lake=lake, recorder=recorder, shared=shared, **client_args)
+        shared = client.shared
+        return client
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        wall, units, unit = RUNNERS[tool](lake, client_factory, options)
+    ops = recorder.summary()
+    return {
+        "scenario": name,
+        "tool": tool,
+        "options": options,
+        "wall_sec": round(wall, 3),
+        "throughput": {"unit": unit, "count": units, "per_sec": round(units / wall, 2) if wall else None},
+        "api_calls": sum(op["count"] for op in ops.values()),
+        "operations": ops,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def parse_value(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return {"true": True, "false": False}.get(value.lower(), value)
+
+def parse_assignments(items):
+    return {k: parse_value(v) for k, _, v in (item.partition("=") for item in items or [])}
+
+def parse_latency(items):
+    """op=median:p99 in milliseconds."""
+    latency = {}
+    for item in items or []:
+        op, _, ms = item.partition("=")
+        median, _, p99 = ms.partition(":")
+        latency[op] = (float(median), float(p99 or median))
+    return latency
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], json.dumps(r["options"], sort_keys=True)): r for r in json.load(f)["results"]}
+    print(f"\nChange against {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["scenario"], json.dumps(r["options"], sort_keys=True)))
+        if not old or not old["throughput"]["per_sec"]:
+            print(f"  {r['scenario']:24} no baseline")
+            continue
+        change = (r["throughput"]["per_sec"] / old["throughput"]["per_sec"] - 1) * 100
+        print(f"  {r['scenario']:24} throughput {change:+.1f}%, api calls {old['api_calls']} -> {r['api_calls']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tools against a simulated BigQuery backend.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--datasets", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=20, help="tables per dataset")
+    parser.add_argument("--columns", type=int, default=30, help="top-level columns per table")
+    parser.add_argument("--changed", type=float, default=0.3, help="share of descriptions that need an update")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", action="append", metavar="OP=MEDIAN:P99",
+                        help="per-call latency in ms, e.g. get_table=80:400")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier for all simulated latencies")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of calls failing with rateLimitExceeded")
+    parser.add_argument("--api-qps", type=int, help="global API calls per second before 429s")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE",
+                        help="scenario option, e.g. max_workers=10 or sleep_ms=200")
+    parser.add_argument("--sweep", metavar="KEY=V1,V2,...", help="run every scenario once per value")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare throughput with")
+    args = parser.parse_args(argv)
+
+    lake_args = dict(datasets=args.datasets, tables=args.tables, columns=args.columns,
+                     changed=args.changed, seed=args.seed)
+    client_args = dict(latency=parse_latency(args.latency), time_scale=args.time_scale,
+                       fail_rate=args.fail_rate, api_qps=args.api_qps, seed=args.seed)
+    overrides = parse_assignments(args.set)
+    runs = [(name, overrides) for name in args.scenario or SCENARIOS]
+    if args.sweep:
+        key, _, values = args.sweep.partition("=")
+        runs = [(name, {**o, key: parse_value(v)}) for name, o in runs for v in values.split(",")]
+
+    # A fresh process per scenario keeps peak RSS and module state separate
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name, run_overrides in runs:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_scenario, (name, lake_args, client_args, run_overrides))
+        results.append(result)
+        label = name + "".join(f" {k}={v}" for k, v in run_overrides.items())
+        print(f"{label:24} {result['throughput']['per_sec']:>10} {result['throughput']['unit']}/sec  "
+              f"{result['wall_sec']:>8.2f} sec  {result['api_calls']:>6} calls  {result['peak_rss_mb']:>7} MB")
+        for op, stats in result["operations"].items():
+            print(f"    {op:22} {stats['count']:>6} calls  p50 {stats['p50_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "lake": lake_args,
+            "client": client_args,
+            "results": results,
+        }, f, indent=2)
+    print(f"\n📄 Results saved to: {args.output}")
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
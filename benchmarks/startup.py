@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark of the tools' command lines and of the API server's import.
+
+Every command runs in a fresh interpreter, after one untimed run that fills the bytecode caches, and
+the median wall time over --runs is reported twice: as the tools start now, with the google-cloud
+libraries loaded on first use, and with those libraries imported up front as the tools used to.
+"""
+
+import os, sys, json, time, argparse, platform, statistics, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+APP_CLI = os.path.join(ROOT, "app-cli")
+CLOUD_NATIVE = os.path.join(ROOT, "cloud-native")
+
+# Modules the tools imported at startup before they were deferred
+TOOL_IMPORTS = ["google.cloud.bigquery", "google.api_core.exceptions", "asyncio"]
+SERVER_IMPORTS = TOOL_IMPORTS + ["httpx"]
+
+# name -> (working directory, interpreter arguments, modules imported eagerly before)
+COMMANDS = {
+    "lake --help":                (APP_CLI, ["-m", "lake", "--help"], TOOL_IMPORTS),
+    "lake update --help":         (APP_CLI, ["-m", "lake", "update", "--help"], TOOL_IMPORTS),
+    "lake compare-tables --help": (APP_CLI, ["-m", "lake", "compare-tables", "--help"], TOOL_IMPORTS),
+    "lake compare-schema --help": (APP_CLI, ["-m", "lake", "compare-schema", "--help"], TOOL_IMPORTS),
+    "lake update --check":        (APP_CLI, ["-m", "lake", "update", "--check"], TOOL_IMPORTS),
+    "import api_server":          (CLOUD_NATIVE, ["-c", "import api_server"], SERVER_IMPORTS),
+}
+
+# A complete configuration, so `update --check` validates it and exits without touching BigQuery
+CHECK_ENV = {"PROJECT_ID": "bench-lake", "METADATA_TABLE": "governance.column_metadata",
+             "JOB_RUN_TABLE": "governance.job_run_log"}
+
+def eager(args, modules):
+    """The same command with `modules` imported before it starts."""
+    preload = f"import {', '.join(modules)}; "
+    if args[0] == "-c":
+        return ["-c", preload + args[1]]
+    module, argv = args[1], args[2:]
+    return ["-c", preload + f"import runpy, sys; sys.argv = {[module] + argv!r}; "
+                            f"runpy.run_module({module!r}, run_name='__main__', alter_sys=True)"]
+
+def timed(cwd, args, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def measure(cwd, args, env, runs):
+    """Median and minimum wall time of `runs` runs, in milliseconds."""
+    timed(cwd, args, env)
+    samples = [timed(cwd, args, env) for _ in range(runs)]
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the start-up time of the tools' command lines.")
+    parser.add_argument("--command", action="append", choices=sorted(COMMANDS),
+                        help="command to time (repeatable; default: all)")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per command and variant")
+    parser.add_argument("--output", default="startup_results.json")
+    args = parser.parse_args(argv)
+
+    env = {**os.environ, **CHECK_ENV, "PYTHONPATH": APP_CLI}
+    results = []
+    for name in args.command or COMMANDS:
+        cwd, command, modules = COMMANDS[name]
+        lazy = measure(cwd, command, env, args.runs)
+        preloaded = measure(cwd, eager(command, modules), env, args.runs)
+        results.append({"command": name, "lazy": lazy, "eager": preloaded,
+                        "speedup": round(preloaded["median_ms"] / lazy["median_ms"], 2)})
+        print(f"{name:28} {lazy['median_ms']:>8.1f} ms lazy  {preloaded['median_ms']:>8.1f} ms eager  "
+              f"{results[-1]['speedup']:>5.2f}x")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "runs": args.runs,
+            "results": results,
+        }, f, indent=2)
+    print(f"\n📄 Results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
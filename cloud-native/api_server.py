@@ -1,10 +1,90 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 from typing import Optional
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter as Tally
+from datetime import datetime, timezone
+import threading
+import asyncio
+import uuid
+import json
 import os
 
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+from lake import updater
+from lake.lazy_import import lazy_import
+
+# Loaded by the first run rather than at startup, which keeps Cloud Run cold starts short
+bigquery = lazy_import("google.cloud.bigquery")
+httpx = lazy_import("httpx")
+
+# Runs execute in this process on a small pool; each project gets at most RUNS_PER_PROJECT at a time
+# and further runs for it wait their turn on the event loop, without holding a runner.
+RUNNER_WORKERS   = int(os.getenv("RUNNER_WORKERS", "4"))
+RUNS_PER_PROJECT = int(os.getenv("RUNS_PER_PROJECT", "1"))
+KEEP_FINISHED    = 100
+
+# Sharded runs: the coordinator (POST /runs) posts each shard to SHARD_TARGET/run, normally this
+# service's own URL so that Cloud Run spreads the shards over instances, or runs them in this process
+# when no target is set. A shard stops after SHARD_RUN_SECONDS, before the request times out, and is
+# resumed up to SHARD_ATTEMPTS times in all.
+SHARD_TARGET      = os.getenv("SHARD_TARGET")
+SHARD_RUN_SECONDS = float(os.getenv("SHARD_RUN_SECONDS", "3300"))
+SHARD_ATTEMPTS    = int(os.getenv("SHARD_ATTEMPTS", "3"))
+
 app = FastAPI()
+runner = ThreadPoolExecutor(max_workers=RUNNER_WORKERS, thread_name_prefix="updater")
+lock = threading.Lock()
+jobs = {}           # job_id -> job record
+clients = {}        # project_id -> bigquery.Client, reused across runs
+apis = {}           # API endpoint -> AsyncBigQuery of ENGINE=async runs, used on the server's event loop
+cache = updater.SchemaCache.from_env()  # table metadata shared by all runs of this instance
+project_slots = {}  # project_id (or project_id, shard_index) -> {"semaphore", "users"}, while runs use or wait for it
+runs = {}           # run_id -> record of a sharded run coordinated by this instance
+background = set()  # dispatch and coordinator tasks, referenced until they finish
+
+class PrometheusListener:
+    """Feeds one run's Telemetry observations into the /metrics registry.
+
+    The queue depth and busy workers of all running runs add up: each run moves the gauges by the
+    change in its own values and withdraws what is left when it ends (close()). Utilisation is only
+    known at the end of a run and is that of the last run to finish.
+    """
+
+    calls = Histogram("updater_bigquery_call_seconds", "Latency of BigQuery calls made by runs",
+                      ["op", "outcome"], buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+    phases = Counter("updater_phase_seconds", "Time spent per run phase, summed over threads", ["phase"])
+    columns = Counter("updater_columns", "Columns processed by status", ["status"])
+    gauges = Gauge("updater_run_gauge", "Queue depth and busy workers summed over running runs, "
+                   "and the worker utilisation of the last finished run", ["name"])
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.levels = {}  # this run's share of the summed gauges
+
+    def observe(self, kind, name, value, **labels):
+        if kind == "call":
+            self.calls.labels(op=name, outcome=labels["outcome"]).observe(value)
+        elif kind == "phase":
+            self.phases.labels(phase=name).inc(value)
+        elif kind == "count":
+            self.columns.labels(status=labels["status"]).inc(value)
+        elif kind == "gauge" and name == "utilisation":
+            self.gauges.labels(name=name).set(value)
+        elif kind == "gauge":
+            with self.lock:
+                self.gauges.labels(name=name).inc(value - self.levels.get(name, 0))
+                self.levels[name] = value
+
+    def close(self):
+        with self.lock:
+            for name, value in self.levels.items():
+                self.gauges.labels(name=name).dec(value)
+            self.levels.clear()
+
+runs_gauge = Gauge("updater_runs_queued", "Runs waiting for a runner or a project slot")
+runs_gauge.set_function(lambda: sum(j["status"] == "queued" for j in list(jobs.values())))
 
 class UpdateRequest(BaseModel):
     project_id: str
@@ -12,31 +92,291 @@ class UpdateRequest(BaseModel):
     job_run_table: str
     sleep_ms: Optional[int] = 1000
     max_workers: Optional[int] = 5
+    full: Optional[bool] = False
+    engine: Optional[str] = None
+    resume: Optional[str] = None  # run ID of an earlier run to continue
+    run_id: Optional[str] = None  # shards of one run share its ID
+    shard_index: Optional[int] = None
+    shard_count: Optional[int] = None
+    max_run_seconds: Optional[float] = None
+    wait: Optional[bool] = False  # respond when the run has finished instead of right away
 
-@app.post("/run")
-async def run_update(req: UpdateRequest):
-    try:
-        env_path = "/tmp/.env"
-        with open(env_path, "w") as f:
-            f.write(f"PROJECT_ID={req.project_id}\n")
-            f.write(f"METADATA_TABLE={req.metadata_table}\n")
-            f.write(f"JOB_RUN_TABLE={req.job_run_table}\n")
-            f.write(f"SLEEP_MSECONDS={req.sleep_ms}\n")
-            f.write(f"MAX_PARALLEL_WORKERS={req.max_workers}\n")
-
-        result = subprocess.run(
-            ["python3", "update_column_descriptions.py", "--log"],
-            env={**os.environ, "ENV_PATH": env_path},
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            cwd="/workspace"
-        )
-
-        if result.returncode != 0:
-            raise HTTPException(status_code=500, detail=result.stderr)
-
-        return {"stdout": result.stdout, "status": "success"}
+class ShardedRunRequest(UpdateRequest):
+    shards: int = 4
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def get_client(cfg):
+    with lock:
+        if cfg.project_id not in clients:
+            clients[cfg.project_id] = updater.make_client(cfg)
+        return clients[cfg.project_id]
+
+def get_api(cfg):
+    with lock:
+        if cfg.api_endpoint not in apis:
+            apis[cfg.api_endpoint] = updater.AsyncBigQuery(cfg.api_endpoint, max_connections=cfg.max_in_flight)
+        return apis[cfg.api_endpoint]
+
+def prune(records, id_key):
+    """Forget the oldest finished jobs (or runs) beyond KEEP_FINISHED."""
+    with lock:
+        finished = [r for r in records.values() if r["finished_at"]]
+        for record in sorted(finished, key=lambda r: r["finished_at"])[:-KEEP_FINISHED]:
+            del records[record[id_key]]
 
+def execute(job_id, cfg, run_id=None, loop=None, api=None):
+    job = jobs[job_id]
+    job.update(status="running", started_at=now_iso())
+    listener = PrometheusListener()
+    try:
+        job["result"] = updater.update_column_descriptions(
+            cfg, client=get_client(cfg), run_id=run_id, log=job["log"], progress=job["progress"], cache=cache,
+            telemetry=updater.Telemetry([listener]), api=api, loop=loop)
+        job["status"] = "succeeded"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        job.update(status="failed", error=str(e))
+    finally:
+        listener.close()
+        job["finished_at"] = now_iso()
+    prune(jobs, "job_id")
+
+async def dispatch(job_id, cfg, run_id, api=None):
+    """Wait for the run's project slot, then execute it on the runner pool.
+
+    Runs queued behind a busy project wait here on the event loop, so the runners only ever hold
+    runs that can start.
+    """
+    # Shards of one run split its tables between them and run side by side, each in a slot of its own.
+    # The slot is the project's for that shard index, so the shards of another run of the project, or a
+    # retried shard, wait for it like runs of the project do.
+    key = (cfg.project_id, cfg.shard_index) if cfg.shard_count > 1 else cfg.project_id
+    slot = project_slots.setdefault(key, {"semaphore": asyncio.Semaphore(RUNS_PER_PROJECT), "users": 0})
+    slot["users"] += 1
+    try:
+        async with slot["semaphore"]:
+            if api:
+                # The run's bookkeeping stays on a runner thread; its tables are coroutines on this event loop.
+                future = runner.submit(execute, job_id, cfg, run_id, asyncio.get_running_loop(), api)
+            else:
+                future = runner.submit(execute, job_id, cfg, run_id)
+            await asyncio.wrap_future(future)
+    finally:
+        slot["users"] -= 1
+        if not slot["users"]:
+            del project_slots[key]
+
+def describe(job):
+    out = {k: v for k, v in job.items() if k != "log"}
+    out["progress"] = dict(job["progress"])
+    out["log_tail"] = list(job["log"].tail)[-20:]
+    return out
+
+def submit(req):
+    """Queue a run for `req`; returns its job ID and the task that dispatches it.
+
+    Must be called on the server's event loop, which runs the tables of ENGINE=async runs.
+    """
+    cfg = updater.Config.from_env(
+        project_id=req.project_id,
+        metadata_table=req.metadata_table,
+        job_run_table=req.job_run_table,
+        sleep_ms=req.sleep_ms,
+        max_workers=req.max_workers,
+        full=req.full,
+        engine=req.engine,
+        resume=req.resume,
+        shard_index=req.shard_index,
+        shard_count=req.shard_count,
+        max_run_seconds=req.max_run_seconds,
+    )
+    try:
+        cfg.validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cfg.shard_count > 1 and not req.run_id:
+        raise HTTPException(status_code=400, detail="Shards need the run_id of the run they belong to")
+
+    # Set up before the job is recorded, so that a failure here fails the request rather than the job
+    api = get_api(cfg) if cfg.engine == "async" else None
+
+    # Named here so that the job's run can be followed in the job log from any instance
+    run_id = req.run_id or req.resume or f"job_{now_iso().replace(':', '-')}_{uuid.uuid4().hex[:6]}"
+    job_id = uuid.uuid4().hex
+    with lock:
+        jobs[job_id] = {
+            "job_id": job_id,
+            "run_id": run_id,
+            "project_id": req.project_id,
+            "status": "queued",
+            "submitted_at": now_iso(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "log": updater.RunLog(),
+        }
+    task = asyncio.create_task(dispatch(job_id, cfg, run_id, api))
+    background.add(task)
+    task.add_done_callback(background.discard)
+    return job_id, task
+
+@app.post("/run", status_code=202)
+async def run_update(req: UpdateRequest, response: Response):
+    job_id, task = submit(req)
+    if req.wait:
+        # A dropped request leaves the run going
+        await asyncio.shield(task)
+        response.status_code = 200
+        return describe(jobs[job_id])
+    return {"job_id": job_id, "run_id": jobs[job_id]["run_id"], "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, run_id: Optional[str] = None, project_id: Optional[str] = None,
+                  job_run_table: Optional[str] = None):
+    """A job of this instance, or, given its run ID, project and job run table, its run's job-log progress.
+
+    Jobs live in the memory of the instance that took the /run request; other instances, and that one
+    after a restart, only have the job log to go by.
+    """
+    job = jobs.get(job_id)
+    if job:
+        return describe(job)
+    if not (run_id and project_id and job_run_table):
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}; pass the run_id of its /run response, "
+                                                    "project_id and job_run_table to read its progress from the job log")
+    client = get_client(updater.Config.from_env(project_id=project_id, job_run_table=job_run_table))
+    return {"job_id": job_id, **await asyncio.to_thread(job_log_progress, client, job_run_table, run_id)}
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def id_token_headers(audience):
+    """Authorization header for calling a private Cloud Run service; empty where no ID token is available."""
+    try:
+        from google.auth.transport.requests import Request
+        from google.oauth2 import id_token
+        return {"Authorization": f"Bearer {id_token.fetch_id_token(Request(), audience)}"}
+    except Exception:
+        return {}
+
+async def run_shard_job(payload):
+    """Run one shard to its end, on another instance through SHARD_TARGET or here; returns its job."""
+    if not SHARD_TARGET:
+        job_id, task = submit(UpdateRequest(**payload))
+        await asyncio.shield(task)
+        return describe(jobs[job_id])
+    headers = await asyncio.to_thread(id_token_headers, SHARD_TARGET)
+    async with httpx.AsyncClient(timeout=SHARD_RUN_SECONDS + 300) as http:
+        resp = await http.post(f"{SHARD_TARGET.rstrip('/')}/run", json={**payload, "wait": True}, headers=headers)
+        resp.raise_for_status()
+        return resp.json()
+
+async def coordinate(record, payload):
+    """Drive every shard of a sharded run; a shard that fails or runs out of time is resumed."""
+
+    async def drive_shard(shard):
+        shard_payload = {**payload, "shard_index": shard["shard_index"]}
+        for attempt in range(1, SHARD_ATTEMPTS + 1):
+            shard["status"], shard["attempts"] = "running", attempt
+            try:
+                job = await run_shard_job(shard_payload)
+            except Exception as e:
+                job = {"job_id": None, "status": "failed", "result": None, "error": str(e)}
+            shard.update(job_id=job["job_id"], result=job["result"], error=job["error"])
+            if job["status"] == "succeeded" and job["result"]["complete"]:
+                shard["status"] = "succeeded"
+                return
+            # Later attempts skip the tables whose checkpoints the earlier ones wrote.
+            shard_payload["resume"] = record["run_id"]
+        shard["status"] = "failed"
+        shard["error"] = shard["error"] or f"tables left after {SHARD_ATTEMPTS} attempt(s)"
+
+    await asyncio.gather(*(drive_shard(shard) for shard in record["shards"]))
+    record["status"] = "succeeded" if all(s["status"] == "succeeded" for s in record["shards"]) else "failed"
+    record["finished_at"] = now_iso()
+    prune(runs, "run_id")
+
+def describe_run(record):
+    """A sharded run with the stats of its shards added up."""
+    results = [s["result"] for s in record["shards"] if s["result"]]
+    stats = Tally()
+    for r in results:
+        stats.update(r["stats"])
+    return {
+        **record,
+        "stats": dict(stats),
+        "total_columns": sum(r["total_columns"] for r in results),
+        "tables_checked": sum(r["tables_checked"] for r in results),
+        "shards_succeeded": sum(s["status"] == "succeeded" for s in record["shards"]),
+    }
+
+def job_log_progress(client, job_run_table, run_id):
+    """Progress of a run read back from its checkpoint and run_timing rows in the job run table."""
+    sql = f"""
+        SELECT status, column_metadata
+        FROM `{job_run_table}`
+        WHERE job_run_id = @run_id AND status IN ('checkpoint', 'run_timing')
+    """
+    job_cfg = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("run_id", "STRING", run_id)])
+    stats, tables, finished = Tally(), 0, set()
+    for r in client.query(sql, job_config=job_cfg).result():
+        data = json.loads(r.column_metadata)
+        if r.status == "checkpoint":
+            tables += 1
+            stats.update({k: data.get(k, 0) for k in ("updated", "skipped", "unmatched", "error")})
+        elif data.get("complete", True):
+            finished.add(data.get("shard", 0))
+    return {"run_id": run_id, "source": "job_log", "tables_done": tables, "stats": dict(stats),
+            "shards_finished": sorted(finished)}
+
+@app.post("/runs", status_code=202)
+async def run_sharded(req: ShardedRunRequest):
+    """Fan a run out into `shards` shard jobs sharing one run ID; follow it with GET /runs/{run_id}."""
+    if req.shards < 1:
+        raise HTTPException(status_code=400, detail="shards must be at least 1")
+    active = next((r for r in runs.values() if r["project_id"] == req.project_id and r["status"] == "running"), None)
+    if active:
+        raise HTTPException(status_code=409, detail=f"Run {active['run_id']} of {req.project_id} is still running; "
+                                                    f"follow it with GET /runs/{active['run_id']}")
+    run_id = req.resume or f"job_{now_iso().replace(':', '-')}_{uuid.uuid4().hex[:6]}"
+    payload = req.model_dump(exclude={"shards", "wait", "run_id", "shard_index", "shard_count"}, exclude_none=True)
+    payload.update(run_id=run_id, shard_count=req.shards)
+    if SHARD_TARGET:
+        payload.setdefault("max_run_seconds", SHARD_RUN_SECONDS)
+    try:
+        updater.Config.from_env(**{k: v for k, v in payload.items() if k in updater.Config.__dataclass_fields__}).validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    record = {
+        "run_id": run_id,
+        "project_id": req.project_id,
+        "job_run_table": req.job_run_table,
+        "status": "running",
+        "submitted_at": now_iso(),
+        "finished_at": None,
+        "dispatch": SHARD_TARGET or "local",
+        "shards": [{"shard_index": i, "status": "queued", "attempts": 0, "job_id": None, "result": None,
+                    "error": None} for i in range(req.shards)],
+    }
+    runs[run_id] = record
+    task = asyncio.create_task(coordinate(record, payload))
+    background.add(task)
+    task.add_done_callback(background.discard)
+    return {"run_id": run_id, "status": "running", "shards": req.shards}
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str, project_id: Optional[str] = None, job_run_table: Optional[str] = None):
+    """A sharded run coordinated here, or, given its project and job run table, any run's job-log progress."""
+    record = runs.get(run_id)
+    if record:
+        return describe_run(record)
+    if not (project_id and job_run_table):
+        raise HTTPException(status_code=404, detail=f"Unknown run {run_id}; pass project_id and job_run_table "
+                                                    "to read its progress from the job log")
+    client = get_client(updater.Config.from_env(project_id=project_id, job_run_table=job_run_table))
+    return await asyncio.to_thread(job_log_progress, client, job_run_table, run_id)
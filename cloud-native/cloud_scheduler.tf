@@ -1,3 +1,15 @@
+locals {
+  # With more than one shard the schedule starts a sharded run through the coordinator endpoint
+  schedule_path = var.shard_count > 1 ? "/runs" : "/run"
+  schedule_body = merge({
+    project_id     = var.project_id,
+    metadata_table = var.metadata_table,
+    job_run_table  = var.job_run_table,
+    sleep_ms       = 500,
+    max_workers    = 5
+  }, { for k, v in { shards = var.shard_count } : k => v if var.shard_count > 1 })
+}
+
 resource "google_cloud_scheduler_job" "column_updater_schedule" {
   name             = "column-updater-job"
   description      = "Trigger BigQuery column updater via Cloud Scheduler"
@@ -7,17 +19,11 @@ resource "google_cloud_scheduler_job" "column_updater_schedule" {
 
   http_target {
     http_method = "POST"
-    uri         = google_cloud_run_service.column_updater.status[0].url
+    uri         = "${google_cloud_run_service.column_updater.status[0].url}${local.schedule_path}"
     headers = {
       "Content-Type" = "application/json"
     }
-    body = base64encode(jsonencode({
-      project_id     = var.project_id,
-      metadata_table = var.metadata_table,
-      job_run_table  = var.job_run_table,
-      sleep_ms       = 500,
-      max_workers    = 5
-    }))
+    body = base64encode(jsonencode(local.schedule_body))
     oidc_token {
       service_account_email = var.scheduler_sa
     }
@@ -26,6 +32,10 @@ resource "google_cloud_scheduler_job" "column_updater_schedule" {
 
 variable "metadata_table" {}
 variable "job_run_table" {}
+variable "shard_count" {
+  description = "Shards a scheduled run is split into, each on its own Cloud Run instance"
+  default     = 1
+}
 variable "scheduler_sa" {
   description = "Service Account used to authenticate Cloud Scheduler job"
 }
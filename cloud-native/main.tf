@@ -13,12 +13,31 @@ provider "google" {
   region  = var.region
 }
 
+data "google_project" "current" {}
+
+locals {
+  service_name = "bq-column-updater"
+  # Cloud Run's deterministic URL; the service posts the shards of sharded runs to itself
+  service_url  = "https://${local.service_name}-${data.google_project.current.number}.${var.region}.run.app"
+}
+
 resource "google_cloud_run_service" "column_updater" {
-  name     = "bq-column-updater"
+  name     = local.service_name
   location = var.region
 
   template {
+    metadata {
+      annotations = {
+        # Runs continue in the background after /run has returned, so keep CPU allocated
+        "run.googleapis.com/cpu-throttling" = "false"
+        # and keep an instance up, so that the last runs are not cut off when their requests are done
+        "autoscaling.knative.dev/minScale"  = tostring(var.min_instances)
+      }
+    }
     spec {
+      # Runs of a project queue for its slot on the instance that serves them, so requests share instances
+      container_concurrency = var.container_concurrency
+      timeout_seconds       = var.request_timeout
       containers {
         image = var.image_url
         ports {
@@ -28,6 +47,15 @@ resource "google_cloud_run_service" "column_updater" {
           name  = "GOOGLE_PROJECT"
           value = var.project_id
         }
+        env {
+          name  = "SHARD_TARGET"
+          value = local.service_url
+        }
+        env {
+          # Shards stop and are resumed before Cloud Run cuts their request off
+          name  = "SHARD_RUN_SECONDS"
+          value = tostring(var.request_timeout - 300)
+        }
       }
     }
   }
@@ -49,4 +77,16 @@ resource "google_cloud_run_service_iam_member" "invoker" {
 
 variable "project_id" {}
 variable "region"     { default = "us-central1" }
-variable "image_url"  { description = "Docker image deployed to Artifact Registry or GCR" }
\ No newline at end of file
+variable "image_url"  { description = "Docker image deployed to Artifact Registry or GCR" }
+variable "container_concurrency" {
+  description = "Requests per instance; shards hold theirs open while they run, and status requests come on top"
+  default     = 80
+}
+variable "min_instances" {
+  description = "Instances kept running while idle; with 0, an instance whose runs outlive their requests may be shut down"
+  default     = 1
+}
+variable "request_timeout" {
+  description = "Cloud Run request timeout in seconds (at most 3600), which bounds one shard invocation"
+  default     = 3600
+}
\ No newline at end of file